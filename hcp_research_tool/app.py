@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-import http.client
 import json
+import orjson
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dateutil.relativedelta import relativedelta
 import gspread
 from google.oauth2 import service_account
@@ -45,6 +46,55 @@ HEALTHCARE_INDUSTRIES = {
     "Physicians": 2040
 }
 
+# Industry codes sent with every LinkedIn search, computed once from the mapping above
+HEALTHCARE_INDUSTRY_CODES = list(HEALTHCARE_INDUSTRIES.values())
+
+# Social activity counters summed into a LinkedIn post's engagement
+LINKEDIN_ENGAGEMENT_FIELDS = [
+    "numComments",
+    "likeCount",
+    "appreciationCount",
+    "empathyCount",
+    "InterestCount",
+    "praiseCount",
+    "funnyCount",
+    "maybeCount"
+]
+
+# Shared HTTP session so reruns reuse the same keep-alive connections
+@st.cache_resource
+def get_http_session():
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, backoff_factor=0.3)
+    ))
+    return session
+
+# Logos shown next to each post, by platform
+PLATFORM_LOGO_URLS = {
+    "LinkedIn": "https://content.linkedin.com/content/dam/me/business/en-us/amp/brand-site/v2/bg/LI-Bug.svg.original.svg",
+    "Twitter": "https://about.twitter.com/content/dam/about-twitter/x/brand-toolkit/logo-black.png.twimg.1920.png",
+    "Reddit": "https://www.redditstatic.com/desktop2x/img/favicon/android-icon-192x192.png"
+}
+
+# Download each logo once per process so rendering posts doesn't refetch them
+@st.cache_resource
+def load_platform_logos():
+    logos = {}
+    for name, url in PLATFORM_LOGO_URLS.items():
+        try:
+            response = get_http_session().get(url, timeout=10)
+            response.raise_for_status()
+            # st.image only accepts SVG as markup text, raster images as bytes
+            is_svg = "svg" in response.headers.get("Content-Type", "")
+            logos[name] = response.text if is_svg else response.content
+        except Exception:
+            # Fall back to the remote URL if the logo could not be downloaded
+            logos[name] = url
+    return logos
+
 # Create sidebar for filters
 st.sidebar.header("Filters")
 
@@ -75,17 +125,20 @@ if platform == "LinkedIn":
         help="Filter posts by when they were posted"
     )
 
+# Authorize the gspread client once per process and set of credentials
+@st.cache_resource
+def get_gspread_client(credentials_json):
+    credentials = service_account.Credentials.from_service_account_info(
+        json.loads(credentials_json)
+    )
+    return gspread.authorize(credentials)
+
 # Function to connect to Google Sheets
 def connect_to_gsheets():
     # Create a connection object
     try:
         # Check if credentials exist as environment variables
-        if 'GOOGLE_CREDENTIALS' in os.environ:
-            # Use credentials from environment variables
-            credentials = service_account.Credentials.from_service_account_info(
-                json.loads(os.environ['GOOGLE_CREDENTIALS'])
-            )
-        else:
+        if 'GOOGLE_CREDENTIALS' not in os.environ:
             # For local development - show instructions
             st.sidebar.warning(
                 "Google Sheets integration requires credentials. "
@@ -93,8 +146,8 @@ def connect_to_gsheets():
             )
             return None
             
-        # Create a client using the credentials
-        gc = gspread.authorize(credentials)
+        # Create a client using the credentials from environment variables
+        gc = get_gspread_client(os.environ['GOOGLE_CREDENTIALS'])
         
         # Open the Google Sheets document
         sheet_url = "https://docs.google.com/spreadsheets/d/1g_jOglUhuARGoDFLeHG0jNAXCFMF7Z5JIFZS_WoFOk8/edit?usp=sharing"
@@ -133,18 +186,12 @@ def add_to_google_sheet(df, search_query=""):
             "Content-Type": "application/json"
         }
         
-        # Convert DataFrame to list of lists for the API
-        rows = []
-        for _, row in df.iterrows():
-            rows.append([
-                row.get('Platform', ''),
-                row.get('Post', ''),
-                row.get('Date', '').strftime('%Y-%m-%d %H:%M:%S') if isinstance(row.get('Date'), datetime) else str(row.get('Date', '')),
-                row.get('Engagement', 0),
-                row.get('Author', ''),
-                row.get('URL', ''),
-                search_query  # Add the search query
-            ])
+        # Convert DataFrame to list of lists for the API in one vectorized pass
+        out = df.reindex(columns=['Platform', 'Post', 'Date', 'Engagement', 'Author', 'URL'], fill_value='')
+        # Format the whole Date column at once; unparseable or missing dates become ''
+        out['Date'] = pd.to_datetime(out['Date'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S').fillna('')
+        out['Search'] = search_query  # Add the search query
+        rows = out.values.tolist()
         
         # Prepare the request body
         data = {
@@ -152,7 +199,7 @@ def add_to_google_sheet(df, search_query=""):
         }
         
         # Make the API request
-        response = requests.post(api_endpoint, headers=headers, json=data)
+        response = get_http_session().post(api_endpoint, headers=headers, data=orjson.dumps(data))
         
         # Check the response
         if response.status_code == 200:
@@ -166,20 +213,23 @@ def add_to_google_sheet(df, search_query=""):
         st.sidebar.error(f"Error saving data: {str(e)}")
         return False
 
+# Save search results to the sheet only the first time a query is seen this session,
+# so reruns served from the cache don't append the same rows again
+def save_search_once(query_key, df, search_query):
+    saved_queries = st.session_state.setdefault("saved_sheet_queries", set())
+    if query_key not in saved_queries and add_to_google_sheet(df, search_query):
+        saved_queries.add(query_key)
+
 # Function to fetch LinkedIn data
+@st.cache_data(ttl=60, show_spinner=False)
 def get_linkedin_data(keyword="nhs pathway", sort_by="relevance", date_posted=""):
-    conn = http.client.HTTPSConnection("linkedin-api8.p.rapidapi.com")
-    
-    # Include all healthcare industry codes in the request
-    industry_codes = list(HEALTHCARE_INDUSTRIES.values())
-    
     payload = {
         "keyword": keyword,
         "sortBy": sort_by,
         "datePosted": date_posted,
         "page": 1,
         "contentType": "",
-        "authorIndustry": industry_codes  
+        "authorIndustry": HEALTHCARE_INDUSTRY_CODES  # Include all healthcare industry codes in the request
     }
     
     api_key = st.secrets["rapidapi"]["key"]
@@ -191,45 +241,35 @@ def get_linkedin_data(keyword="nhs pathway", sort_by="relevance", date_posted=""
     }
     
     try:
-        conn.request("POST", "/search-posts", json.dumps(payload), headers)
-        res = conn.getresponse()
-        data = res.read()
-        response = json.loads(data.decode("utf-8"))
+        res = get_http_session().post(
+            "https://linkedin-api8.p.rapidapi.com/search-posts",
+            json=payload,
+            headers=headers,
+            timeout=15
+        )
+        response = orjson.loads(res.content)
         
         # Process the LinkedIn API response into a DataFrame
         if 'success' in response and response['success'] and 'data' in response and 'items' in response['data']:
-            posts = []
-            for post in response['data']['items']:
-                # Convert timestamp to datetime (ms to datetime)
-                if 'postedDateTimestamp' in post:
-                    created_time = datetime.fromtimestamp(post.get('postedDateTimestamp', 0)/1000)
-                else:
-                    created_time = datetime.now()
-                
+            # Flatten all posts at once; missing fields come back as NaN columns
+            social_cols = [f"socialActivityCountsInsight.{field}" for field in LINKEDIN_ENGAGEMENT_FIELDS]
+            posts = pd.json_normalize(response['data']['items']).reindex(
+                columns=['text', 'postedDateTimestamp', 'author.fullName', 'url', *social_cols]
+            )
+            
+            df = pd.DataFrame({
+                "Platform": "LinkedIn",
+                "Post": posts['text'].fillna('No content'),
+                # Convert timestamp to datetime (ms to datetime) as UTC-aware, like the Twitter dates
+                "Date": pd.to_datetime(posts['postedDateTimestamp'], unit='ms', utc=True).fillna(pd.Timestamp.now(tz="UTC")),
                 # Calculate engagement as sum of all social activities
-                engagement = 0
-                if 'socialActivityCountsInsight' in post:
-                    social_stats = post['socialActivityCountsInsight']
-                    engagement = (
-                        social_stats.get('numComments', 0) +
-                        social_stats.get('likeCount', 0) +
-                        social_stats.get('appreciationCount', 0) +
-                        social_stats.get('empathyCount', 0) +
-                        social_stats.get('InterestCount', 0) +
-                        social_stats.get('praiseCount', 0) +
-                        social_stats.get('funnyCount', 0) +
-                        social_stats.get('maybeCount', 0)
-                    )
-                
-                posts.append({
-                    "Platform": "LinkedIn",
-                    "Post": post.get('text', 'No content'),
-                    "Date": created_time,
-                    "Engagement": engagement,
-                    "Author": post.get('author', {}).get('fullName', 'Unknown'),
-                    "URL": post.get('url', '')
-                })
-            return pd.DataFrame(posts)
+                "Engagement": posts[social_cols].fillna(0).sum(axis=1).astype("int32"),
+                "Author": posts['author.fullName'].fillna('Unknown'),
+                "URL": posts['url'].fillna('')
+            })
+            df["Platform"] = df["Platform"].astype("category")
+            # Sort once here so the cached frame is already ordered by engagement
+            return df.sort_values(by="Engagement", ascending=False, ignore_index=True)
         else:
             st.error("Failed to retrieve LinkedIn data. API response format unexpected.")
             return pd.DataFrame()
@@ -238,19 +278,34 @@ def get_linkedin_data(keyword="nhs pathway", sort_by="relevance", date_posted=""
         return pd.DataFrame()
 
 # Mock data from Google Sheet
-def load_mock_data_from_sheet():
+@st.cache_data(ttl=300, show_spinner=False)
+def load_mock_data_from_sheet(platform="All"):
     try:
         with st.spinner("Loading test data from Google Sheet..."):
             sheet_url = "https://docs.google.com/spreadsheets/d/1g_jOglUhuARGoDFLeHG0jNAXCFMF7Z5JIFZS_WoFOk8/edit?usp=sharing"
             sheet_url = sheet_url.replace('/edit?usp=sharing', '/export?format=csv')
-            df = pd.read_csv(sheet_url)
+            # Stream the export straight into pandas over the pooled session
+            with get_http_session().get(sheet_url, stream=True, timeout=20) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                # Parse dates and pin column types during the single CSV read pass
+                df = pd.read_csv(
+                    response.raw,
+                    parse_dates=["Date"],
+                    dtype={"Platform": "category", "Author": "string", "Post": "string", "Engagement": "Int32"}
+                )
+            # read_csv leaves Date as text if it cannot infer one format; convert explicitly then
+            if not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+                df["Date"] = pd.to_datetime(df["Date"])
             
-            # Convert Date column to datetime
-            df["Date"] = pd.to_datetime(df["Date"])
+            # Filter by platform here so each platform gets its own cached slice
+            if platform != "All":
+                df = df[df["Platform"] == platform]
             
             if not df.empty:
                 st.success(f"Successfully loaded {len(df)} posts from Google Sheet as default dataset")
-                return df
+                # Sort once here so the cached frame is already ordered by engagement
+                return df.sort_values(by="Engagement", ascending=False, ignore_index=True)
     except Exception as e:
         st.error(f"Error loading data from Google Sheet: {str(e)}")
     
@@ -273,12 +328,8 @@ def generate_mock_data():
     return df
 
 # Function to fetch Twitter data
+@st.cache_data(ttl=60, show_spinner=False)
 def get_twitter_data(keyword="nhs pathway", max_results=10):
-    conn = http.client.HTTPSConnection("twitter-api45.p.rapidapi.com")
-    
-    # Replace spaces with %20 for URL encoding
-    encoded_keyword = keyword.replace(" ", "%20")
-    
     # Get API key from secrets
     try:
         api_key = st.secrets["rapidapi"]["key"]
@@ -291,48 +342,37 @@ def get_twitter_data(keyword="nhs pathway", max_results=10):
         'x-rapidapi-host': "twitter-api45.p.rapidapi.com"
     }
     
-    # Construct the endpoint to search tweets
-    endpoint = f"/search.php?query={encoded_keyword}&max_results={max_results}"
-    
     try:
-        conn.request("GET", endpoint, headers=headers)
-        res = conn.getresponse()
-        data = res.read()
-        response = json.loads(data.decode("utf-8"))
+        # Search tweets; requests takes care of URL-encoding the query parameters
+        res = get_http_session().get(
+            "https://twitter-api45.p.rapidapi.com/search.php",
+            params={"query": keyword, "max_results": max_results},
+            headers=headers,
+            timeout=15
+        )
+        response = orjson.loads(res.content)
         
         # Process the Twitter API response into a DataFrame
         if 'timeline' in response:
-            posts = []
-            for tweet in response['timeline']:
-                if tweet.get('type') == 'tweet':
-                    # Calculate engagement as sum of interactions
-                    engagement = (
-                        tweet.get('favorites', 0) + 
-                        tweet.get('retweets', 0) + 
-                        tweet.get('replies', 0) + 
-                        tweet.get('quotes', 0) +
-                        tweet.get('bookmarks', 0)
-                    )
-                    
-                    # Get media URL if available
-                    media_url = ""
-                    if 'media' in tweet:
-                        if 'photo' in tweet['media'] and len(tweet['media']['photo']) > 0:
-                            media_url = tweet['media']['photo'][0].get('media_url_https', '')
-                        elif 'video' in tweet['media'] and len(tweet['media']['video']) > 0:
-                            media_url = tweet['media']['video'][0].get('media_url_https', '')
-                    
-                    created_time = datetime.strptime(tweet.get('created_at', ''), "%a %b %d %H:%M:%S %z %Y") if 'created_at' in tweet else datetime.now()
-                    
-                    posts.append({
-                        "Platform": "Twitter",
-                        "Post": tweet.get('text', 'No content'),
-                        "Date": created_time,
-                        "Engagement": engagement,
-                        "Author": tweet.get('screen_name', 'Unknown'),
-                        "URL": f"https://twitter.com/{tweet.get('screen_name')}/status/{tweet.get('tweet_id')}"
-                    })
-            return pd.DataFrame(posts)
+            # Flatten the timeline at once and keep only actual tweets
+            engagement_cols = ['favorites', 'retweets', 'replies', 'quotes', 'bookmarks']
+            tweets = pd.json_normalize(response['timeline']).reindex(
+                columns=['type', 'text', 'created_at', 'screen_name', 'tweet_id', *engagement_cols]
+            )
+            tweets = tweets[tweets['type'] == 'tweet']
+            
+            df = pd.DataFrame({
+                "Platform": "Twitter",
+                "Post": tweets['text'].fillna('No content'),
+                "Date": pd.to_datetime(tweets['created_at'], format="%a %b %d %H:%M:%S %z %Y", utc=True).fillna(pd.Timestamp.now(tz="UTC")),
+                # Calculate engagement as sum of interactions
+                "Engagement": tweets[engagement_cols].fillna(0).sum(axis=1).astype("int32"),
+                "Author": tweets['screen_name'].fillna('Unknown'),
+                "URL": "https://twitter.com/" + tweets['screen_name'].astype(str) + "/status/" + tweets['tweet_id'].astype(str)
+            })
+            df["Platform"] = df["Platform"].astype("category")
+            # Sort once here so the cached frame is already ordered by engagement
+            return df.sort_values(by="Engagement", ascending=False, ignore_index=True)
         else:
             st.error("Failed to retrieve Twitter data. API response format unexpected.")
             return pd.DataFrame()
@@ -355,22 +395,16 @@ if platform == "LinkedIn" and linkedin_keyword and linkedin_keyword.lower() != "
             linkedin_df = get_linkedin_data(linkedin_keyword, linkedin_sort, date_posted)
             if not linkedin_df.empty:
                 df = linkedin_df
-                # Sort by engagement in descending order
-                df = df.sort_values(by="Engagement", ascending=False)
                 st.success(f"Successfully retrieved {len(df)} LinkedIn posts")
                 
-                # Automatically save results to Google Sheet
-                add_to_google_sheet(df, linkedin_keyword)
+                # Automatically save results to Google Sheet, once per unique query
+                save_search_once(("LinkedIn", linkedin_keyword, date_posted), df, linkedin_keyword)
             else:
                 st.warning("Could not retrieve LinkedIn data. Using mockup data instead.")
                 df = load_mock_data_from_sheet()
-                # Sort by engagement in descending order
-                df = df.sort_values(by="Engagement", ascending=False)
         except Exception as e:
             st.error(f"Error: {str(e)}")
             df = load_mock_data_from_sheet()
-            # Sort by engagement in descending order
-            df = df.sort_values(by="Engagement", ascending=False)
             st.warning("Using mockup data due to API error.")
 elif platform == "Twitter" and twitter_keyword and twitter_keyword.lower() != "":
     # Use Twitter API if a keyword is provided for Twitter
@@ -379,69 +413,55 @@ elif platform == "Twitter" and twitter_keyword and twitter_keyword.lower() != ""
             twitter_df = get_twitter_data(twitter_keyword, twitter_max_results)
             if not twitter_df.empty:
                 df = twitter_df
-                # Sort by engagement in descending order
-                df = df.sort_values(by="Engagement", ascending=False)
                 st.success(f"Successfully retrieved {len(df)} Twitter posts")
                 
-                # Automatically save results to Google Sheet
-                add_to_google_sheet(df, twitter_keyword)
+                # Automatically save results to Google Sheet, once per unique query
+                save_search_once(("Twitter", twitter_keyword, twitter_max_results), df, twitter_keyword)
             else:
                 st.warning("Could not retrieve Twitter data. Using mockup data instead.")
-                df = load_mock_data_from_sheet()
-                # Filter to only Twitter posts
-                df = df[df["Platform"] == "Twitter"]
-                # Sort by engagement in descending order
-                df = df.sort_values(by="Engagement", ascending=False)
+                df = load_mock_data_from_sheet("Twitter")
         except Exception as e:
             st.error(f"Error: {str(e)}")
-            df = load_mock_data_from_sheet()
-            # Filter to only Twitter posts
-            df = df[df["Platform"] == "Twitter"]
-            # Sort by engagement in descending order
-            df = df.sort_values(by="Engagement", ascending=False)
+            df = load_mock_data_from_sheet("Twitter")
             st.warning("Using mockup data due to API error.")
 else:
-    # Load from Google Sheet by default
-    df = load_mock_data_from_sheet()
-    
-    # Filter by platform if needed
-    if platform != "All":
-        df = df[df["Platform"] == platform]
-    
-    # Sort by engagement in descending order
-    df = df.sort_values(by="Engagement", ascending=False)
+    # Load from Google Sheet by default, filtered to the selected platform
+    df = load_mock_data_from_sheet(platform)
 
 # Display filtered data
 st.header("Posts")
 
 # Create a more detailed display for posts
 if not df.empty:
-    for i, row in df.iterrows():
+    # Mock data may not carry a URL column; add it once so every row has the field
+    if "URL" not in df.columns:
+        df = df.assign(URL="")
+
+    platform_logos = load_platform_logos()
+
+    for row in df.itertuples(index=False):
         with st.container():
             col1, col2 = st.columns([1, 4])
             
             with col1:
                 # Display platform icon or logo
-                if row["Platform"] == "LinkedIn":
-                    st.image("https://content.linkedin.com/content/dam/me/business/en-us/amp/brand-site/v2/bg/LI-Bug.svg.original.svg", width=50)
-                elif row["Platform"] == "Twitter":
-                    st.image("https://about.twitter.com/content/dam/about-twitter/x/brand-toolkit/logo-black.png.twimg.1920.png", width=50)
-                elif row["Platform"] == "Reddit":
-                    st.image("https://www.redditstatic.com/desktop2x/img/favicon/android-icon-192x192.png", width=50)
+                logo = platform_logos.get(row.Platform)
+                if logo is not None:
+                    st.image(logo, width=50)
                 
-                # Display engagement metrics
-                st.metric("Engagement", row["Engagement"])
+                # Display engagement metrics; nullable Engagement is NA for posts without counts, which st.metric rejects
+                st.metric("Engagement", row.Engagement if pd.notna(row.Engagement) else None)
             
             with col2:
                 # Author and date
-                st.markdown(f"**{row['Author']}** • {row['Date'].strftime('%Y-%m-%d')}")
+                st.markdown(f"**{row.Author}** • {row.Date.strftime('%Y-%m-%d')}")
                 
                 # Post content
-                st.write(row["Post"])
+                st.write(row.Post)
                 
                 # If URL exists, make it clickable
-                if "URL" in row and row["URL"]:
-                    st.markdown(f"[View on {row['Platform']}]({row['URL']})")
+                if row.URL:
+                    st.markdown(f"[View on {row.Platform}]({row.URL})")
             
             st.divider()
 
@@ -454,18 +474,22 @@ else:
 # Show engagement metrics
 st.header("Engagement Metrics")
 if not df.empty:
+    # Compute the engagement metrics in a single agg call over the column
+    engagement_stats = df["Engagement"].agg(["mean", "max"])
+    
     # Create metrics
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Total Posts", len(df))
     with col2:
-        st.metric("Average Engagement", round(df["Engagement"].mean(), 2))
+        st.metric("Average Engagement", round(engagement_stats["mean"], 2) if pd.notna(engagement_stats["mean"]) else None)
     with col3:
-        st.metric("Max Engagement", df["Engagement"].max())
+        # agg returns floats, and nullable Engagement gives NA when every value is missing
+        st.metric("Max Engagement", int(engagement_stats["max"]) if pd.notna(engagement_stats["max"]) else None)
     
     # Create a bar chart for engagement by platform
     if platform == "All":
-        platform_stats = df.groupby("Platform")["Engagement"].mean().reset_index()
+        platform_stats = df.groupby("Platform", observed=True)["Engagement"].mean().reset_index()
         st.bar_chart(platform_stats.set_index("Platform"))
     else:
         st.bar_chart(df.set_index("Date")["Engagement"])
@@ -484,7 +508,7 @@ if st.sidebar.button("Apply Filters"):
         if platform != "All":
             filtered_df = df[df["Platform"] == platform]
         else:
-            filtered_df = df.copy()
+            filtered_df = df
         
         # Filter by engagement
         filtered_df = filtered_df[filtered_df["Engagement"] >= min_engagement]
@@ -494,9 +518,10 @@ if st.sidebar.button("Apply Filters"):
         
         # Update metrics
         if not filtered_df.empty:
+            filtered_stats = filtered_df["Engagement"].agg(["mean", "max"])
             st.metric("Total Posts", len(filtered_df))
-            st.metric("Average Engagement", round(filtered_df["Engagement"].mean(), 2))
-            st.metric("Max Engagement", filtered_df["Engagement"].max())
+            st.metric("Average Engagement", round(filtered_stats["mean"], 2) if pd.notna(filtered_stats["mean"]) else None)
+            st.metric("Max Engagement", int(filtered_stats["max"]) if pd.notna(filtered_stats["max"]) else None)
         else:
             st.info("No data available for the selected filters.")
     else:
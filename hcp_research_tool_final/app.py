@@ -2,14 +2,29 @@
 
 import streamlit as st
 import pandas as pd
-import http.client
-import json
+import pyarrow.csv as pacsv
+import io
+import orjson
+import hashlib
+import re
+from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import os
+import logging
 import openai  # Add OpenAI import
 import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+# Debug logging, enabled with LOG_LEVEL=DEBUG
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("LOG_LEVEL", "WARNING").upper())
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
 
 # Set page configuration
 st.set_page_config(
@@ -47,6 +62,55 @@ HEALTHCARE_INDUSTRIES = {
     "Physicians": 2040
 }
 
+# LinkedIn social activity counts summed into Engagement, as flattened by json_normalize
+LINKEDIN_ENGAGEMENT_FIELDS = ("numComments", "likeCount", "appreciationCount", "empathyCount", "InterestCount", "praiseCount", "funnyCount", "maybeCount")
+LINKEDIN_ENGAGEMENT_COLUMNS = [f"socialActivityCountsInsight.{field}" for field in LINKEDIN_ENGAGEMENT_FIELDS]
+
+# Maximum number of rows sent to the Google Sheet webhook per request
+WEBHOOK_BATCH_SIZE = 500
+
+# OpenAI model and prompt size limits for the analysis samples
+OPENAI_MODEL = "gpt-4o-mini"
+OPENAI_POST_CHAR_LIMIT = 400
+OPENAI_SAMPLE_CHAR_BUDGET = 24000  # roughly 6k tokens at ~4 characters per token
+
+# Subreddit name from a full reddit.com/r/ URL, an r/ or @ prefixed name, or a bare name
+SUBREDDIT_RE = re.compile(r'(?:.*?reddit\.com/r/|r/|@)?([^/\s]+)', re.IGNORECASE)
+
+# Resolve secrets, sheet export URLs and static request headers once per process
+@st.cache_resource
+def get_config():
+    rapidapi_key = st.secrets["rapidapi"]["key"]
+    return SimpleNamespace(
+        rapidapi_headers={
+            "linkedin-api8.p.rapidapi.com": {
+                'x-rapidapi-key': rapidapi_key,
+                'x-rapidapi-host': "linkedin-api8.p.rapidapi.com",
+                'Content-Type': "application/json"
+            },
+            "twitter154.p.rapidapi.com": {
+                'x-rapidapi-key': rapidapi_key,
+                'x-rapidapi-host': "twitter154.p.rapidapi.com"
+            },
+            "reddit-scraper2.p.rapidapi.com": {
+                'x-rapidapi-key': rapidapi_key,
+                'x-rapidapi-host': "reddit-scraper2.p.rapidapi.com"
+            }
+        },
+        openai_client=openai.OpenAI(api_key=st.secrets["openai"]["api_key"]),
+        sheet_url=st.secrets["gsheets"]["sheet_url"].replace('/edit?gid=0', '/export?format=csv'),
+        mock_sheet_url=st.secrets["gsheets"]["mock_sheet_url"].replace('/edit?usp=sharing', '/export?format=csv'),
+        webhook_url=st.secrets["webhook"]["url"],
+        webhook_auth=(st.secrets["webhook"]["username"], st.secrets["webhook"]["password"])
+    )
+
+# Check the configuration at startup rather than partway through a search
+try:
+    get_config()
+except Exception as e:
+    st.error(f"Missing or invalid configuration in secrets: {str(e)}")
+    st.stop()
+
 # Create sidebar for filters
 st.sidebar.header("Filters")
 
@@ -79,52 +143,107 @@ if platform == "LinkedIn":
 
 
 
+# Shared HTTP session so API calls reuse pooled keep-alive connections across reruns
+@st.cache_resource
+def get_http_session():
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries))
+    return session
+
+# Keep the highest-engagement row for each post, deduplicating with a hash groupby rather than a full sort
+def dedupe_posts(df):
+    df = df.reset_index(drop=True)
+    best = df["Engagement"].fillna(float("-inf")).groupby(df["Post"], sort=False, dropna=False).idxmax()
+    return df.loc[best].sort_values(by="Engagement", ascending=False, kind="stable")
+
+# Download a Google Sheet CSV export, cached by URL so reruns don't re-download it
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_sheet_csv(sheet_url):
+    response = get_http_session().get(sheet_url, timeout=30)
+    response.raise_for_status()
+    # Parse with Arrow's multi-threaded CSV reader; newlines_in_values keeps quoted multi-line posts
+    # intact, which pandas' pyarrow engine cannot do once the file spans more than one block
+    table = pacsv.read_csv(
+        io.BytesIO(response.content),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+    )
+    return table.to_pandas()
+
+# Clean and deduplicate the mock sheet once per download
+@st.cache_data(ttl=600, show_spinner=False)
+def prepare_mock_data(sheet_url):
+    df = fetch_sheet_csv(sheet_url)
+    
+    # Convert Date column to datetime
+    df["Date"] = pd.to_datetime(df["Date"])
+    
+    # Downcast Engagement and store Platform as a category to shrink the frame
+    df["Engagement"] = pd.to_numeric(df["Engagement"], errors="coerce").fillna(0).astype("int32")
+    df["Platform"] = df["Platform"].astype("category")
+    
+    # Deduplicate and show highest engagement first
+    return dedupe_posts(df)
+
+# Clean the Big Data sheet and merge in the mock posts once per download
+@st.cache_data(ttl=600, show_spinner=False)
+def prepare_big_data(sheet_url, mock_sheet_url):
+    # Download the big data and mock sheets concurrently rather than one after the other
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        big_future = executor.submit(fetch_sheet_csv, sheet_url)
+        mock_future = executor.submit(prepare_mock_data, mock_sheet_url)
+    df = big_future.result()
+    
+    # Create Platform column and rename columns for consistency
+    df["Platform"] = "External Source"
+    df = df.rename(columns={
+        "content": "Post",
+        "title": "Author",
+        "score": "Engagement",
+        "url": "URL"
+    })
+    
+    # Handle date conversion
+    if "created_at" in df.columns:
+        df["Date"] = pd.to_datetime(df["created_at"], errors='coerce')
+    else:
+        df["Date"] = datetime.now()
+    
+    # Ensure URL column exists
+    if "URL" not in df.columns:
+        df["URL"] = ""
+        
+    # Select only needed columns
+    columns = ["Platform", "Post", "Date", "Engagement", "Author", "URL", "raw_content"]
+    df = df[columns]
+    df["Engagement"] = pd.to_numeric(df["Engagement"], errors="coerce").fillna(0).astype("int32")
+    
+    if df.empty:
+        return df
+    
+    # Augment with mock data; the mock posts are optional, so keep the big data if they fail to load
+    try:
+        mock_df = mock_future.result()
+    except Exception:
+        mock_df = pd.DataFrame()
+    if not mock_df.empty:
+        df = pd.concat([df, mock_df], ignore_index=True)
+    
+    # Clean and deduplicate the combined posts in one pass
+    df = dedupe_posts(df)
+    df["Platform"] = df["Platform"].astype("category")
+    return df
+
 # Add function to load data from the specified Big Data Google Sheet
 def load_big_data_from_sheet():
     try:
         with st.spinner("Loading big data from Google Sheet..."):
-            # Get sheet URL from secrets
-            sheet_url = st.secrets["gsheets"]["sheet_url"]
-            sheet_url = sheet_url.replace('/edit?gid=0', '/export?format=csv')
-            df = pd.read_csv(sheet_url)
-            
-            # Create Platform column and rename columns for consistency
-            df["Platform"] = "External Source"
-            df = df.rename(columns={
-                "content": "Post",
-                "title": "Author",
-                "score": "Engagement",
-                "url": "URL"
-            })
-            
-            # Handle date conversion
-            if "created_at" in df.columns:
-                df["Date"] = pd.to_datetime(df["created_at"], errors='coerce')
-            else:
-                df["Date"] = datetime.now()
-            
-            # Ensure URL column exists
-            if "URL" not in df.columns:
-                df["URL"] = ""
-                
-            # Select only needed columns
-            columns = ["Platform", "Post", "Date", "Engagement", "Author", "URL", "raw_content"]
-            df = df[columns]
+            # Get sheet URLs from the configuration
+            config = get_config()
+            df = prepare_big_data(config.sheet_url, config.mock_sheet_url)
             
-            # Process and combine with mock data
             if not df.empty:
-                # Clean and deduplicate
-                df = df.sort_values(by="Engagement", ascending=False)
-                df = df.drop_duplicates(subset=["Post"], keep="first")
-                
-                # Augment with mock data
-                mock_df = load_mock_data_from_sheet()
-                if not mock_df.empty:
-                    # Combine and deduplicate again
-                    df = pd.concat([df, mock_df])
-                    df = df.sort_values(by="Engagement", ascending=False)
-                    df = df.drop_duplicates(subset=["Post"], keep="first")
-                
                 return df
     except Exception as e:
         st.error(f"Error loading data from Big Data Google Sheet: {str(e)}")
@@ -132,39 +251,53 @@ def load_big_data_from_sheet():
     # Return empty DataFrame if failed
     return pd.DataFrame()
 
-# Function for OpenAI analysis
-def analyze_with_openai(df, prompt):
+# Function for OpenAI analysis, streamed into the given placeholder as it arrives
+def analyze_with_openai(df, prompt, placeholder):
     try:
-        # Get API key from secrets
-        api_key = st.secrets["openai"]["api_key"]
+        # Reuse the earlier result if this exact data and prompt were already analyzed in this session
+        data_hash = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+        cache_key = (data_hash, prompt)
+        analysis_cache = st.session_state.setdefault("openai_analysis_cache", {})
+        if cache_key in analysis_cache:
+            placeholder.markdown(analysis_cache[cache_key])
+            return analysis_cache[cache_key]
         
         # Create a more efficient sampling strategy
         # Get high engagement posts with more weight
         high_engagement = df.nlargest(5, 'Engagement')[['Post', 'Engagement', 'Author', 'Platform']]
         
-        # Get diverse samples from different platforms
-        platform_samples = []
-        for platform in df['Platform'].unique():
-            platform_df = df[df['Platform'] == platform]
-            if not platform_df.empty:
-                platform_samples.append(platform_df.sample(min(3, len(platform_df))))
+        # Get diverse samples from different platforms: shuffle once, then keep up to 3 posts per platform
+        shuffled_platforms = df['Platform'].sample(frac=1)
+        sample_index = shuffled_platforms.groupby(shuffled_platforms, observed=True, sort=False).head(3).index
+        diverse_sample = df.loc[sample_index, ['Post', 'Engagement', 'Author', 'Platform']]
         
-        if platform_samples:
-            diverse_sample = pd.concat(platform_samples)[['Post', 'Engagement', 'Author', 'Platform']]
-        else:
+        if diverse_sample.empty:
             # Fallback to random sampling if no platform-specific samples
             diverse_sample = df.sample(min(10, len(df)))[['Post', 'Engagement', 'Author', 'Platform']]
         
-        # Get comprehensive statistics
+        # Serialize the samples as compact JSON records with truncated posts to keep the prompt small
+        high_engagement = high_engagement.assign(Post=high_engagement['Post'].astype(str).str.slice(0, OPENAI_POST_CHAR_LIMIT))
+        diverse_sample = diverse_sample.assign(Post=diverse_sample['Post'].astype(str).str.slice(0, OPENAI_POST_CHAR_LIMIT))
+        high_engagement_json = high_engagement.to_json(orient="records", force_ascii=False)
+        diverse_sample_json = diverse_sample.to_json(orient="records", force_ascii=False)
+        
+        # Drop diverse sample rows until both samples fit the prompt budget
+        while len(diverse_sample) > 1 and len(high_engagement_json) + len(diverse_sample_json) > OPENAI_SAMPLE_CHAR_BUDGET:
+            diverse_sample = diverse_sample.iloc[:len(diverse_sample) // 2]
+            diverse_sample_json = diverse_sample.to_json(orient="records", force_ascii=False)
+        
+        # Get comprehensive statistics, one aggregation pass per column
+        engagement_stats = df['Engagement'].agg(['mean', 'max', 'min', 'std'])
+        date_min, date_max = df['Date'].agg(['min', 'max'])
         stats = {
             'total_records': len(df),
-            'avg_engagement': df['Engagement'].mean(),
-            'max_engagement': df['Engagement'].max(),
-            'min_engagement': df['Engagement'].min(),
-            'engagement_std': df['Engagement'].std(),
+            'avg_engagement': engagement_stats['mean'],
+            'max_engagement': engagement_stats['max'],
+            'min_engagement': engagement_stats['min'],
+            'engagement_std': engagement_stats['std'],
             'unique_authors': df['Author'].nunique(),
-            'platforms': df['Platform'].value_counts().to_dict(),
-            'date_range': f"{df['Date'].min().strftime('%Y-%m-%d')} to {df['Date'].max().strftime('%Y-%m-%d')}",
+            'platforms': df['Platform'].value_counts().loc[lambda counts: counts > 0].to_dict(),
+            'date_range': f"{date_min.strftime('%Y-%m-%d')} to {date_max.strftime('%Y-%m-%d')}",
         }
         
         # Construct an improved prompt
@@ -184,10 +317,10 @@ def analyze_with_openai(df, prompt):
         - Unique Authors: {stats['unique_authors']}
         
         ## HIGH ENGAGEMENT SAMPLE:
-        {high_engagement.to_string()}
+        {high_engagement_json}
         
         ## DIVERSE PLATFORM SAMPLE:
-        {diverse_sample.to_string()}
+        {diverse_sample_json}
 
         ## USER ANALYSIS REQUEST:
         {prompt}
@@ -197,10 +330,10 @@ def analyze_with_openai(df, prompt):
         """
         
         # Use the OpenAI client to make the API call
-        client = openai.OpenAI(api_key=api_key)
+        client = get_config().openai_client
         
-        response = client.chat.completions.create(
-            model="gpt-4",
+        stream = client.chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[
                 {
                     "role": "system", 
@@ -211,94 +344,112 @@ def analyze_with_openai(df, prompt):
                     "content": full_prompt
                 }
             ],
-            temperature=0.3  # Lower temperature for more focused analysis
+            temperature=0.3,  # Lower temperature for more focused analysis
+            stream=True
         )
         
+        # Render tokens as they arrive instead of waiting for the full response
+        parts = []
+        for chunk in stream:
+            if chunk.choices:
+                parts.append(chunk.choices[0].delta.content or "")
+                placeholder.markdown("".join(parts))
+        
         # Return the analysis
-        return response.choices[0].message.content
+        analysis = "".join(parts)
+        analysis_cache[cache_key] = analysis
+        return analysis
     
     except Exception as e:
-        return f"Error during OpenAI analysis: {str(e)}"
+        error_message = f"Error during OpenAI analysis: {str(e)}"
+        placeholder.markdown(error_message)
+        return error_message
 
-# Add to Google Sheet using webhook
-def add_to_google_sheet(df, search_query=""):
-    try:
-        # Get the webhook URL and credentials from secrets
-        webhook_url = st.secrets["webhook"]["url"]
-        username = st.secrets["webhook"]["username"]
-        password = st.secrets["webhook"]["password"]
-        
-        # Convert DataFrame to list of dictionaries for the API
-        rows = []
-        for _, row in df.iterrows():
-            rows.append({
-                'Platform': row.get('Platform', ''),
-                'Post': row.get('Post', ''),
-                'Date': row.get('Date', '').strftime('%Y-%m-%d %H:%M:%S') if isinstance(row.get('Date'), datetime) else str(row.get('Date', '')),
-                'Engagement': row.get('Engagement', 0),
-                'Author': row.get('Author', ''),
-                'URL': row.get('URL', ''),
-                'Search': search_query  # Add the search query
-            })
-        
+# Background pool for Google Sheet writes so results render without waiting on the webhook
+@st.cache_resource
+def get_sheet_writer():
+    return ThreadPoolExecutor(max_workers=2)
+
+# Post rows to the webhook in batches; runs on a writer thread, so it returns an error message instead of calling st
+def post_rows_to_webhook(session, webhook_url, auth, rows):
+    # Send the rows in batches so large result sets don't become one huge request body
+    for start in range(0, len(rows), WEBHOOK_BATCH_SIZE):
         # Prepare the request data
         data = {
-            "rows": rows
+            "rows": rows[start:start + WEBHOOK_BATCH_SIZE]
         }
         
         # Make the API request with basic auth
-        response = requests.post(
+        response = session.post(
             webhook_url, 
             json=data,
-            auth=(username, password)
+            auth=auth
         )
         
         # Check the response
-        if response.status_code == 200:
-            return True
-        else:
-            st.sidebar.error(f"Error saving data: {response.status_code} - {response.text}")
-            return False
+        if response.status_code != 200:
+            return f"Error saving data: {response.status_code} - {response.text}"
+    
+    return None
+
+# Show errors from background Google Sheet writes that finished since the last rerun
+def report_sheet_writes():
+    pending = st.session_state.setdefault("pending_sheet_writes", [])
+    for future in [f for f in pending if f.done()]:
+        pending.remove(future)
+        error = f"Error saving data: {str(future.exception())}" if future.exception() else future.result()
+        if error:
+            st.toast(error)
+
+# Add to Google Sheet using webhook
+def add_to_google_sheet(df, search_query=""):
+    try:
+        # Get the webhook URL and credentials from the configuration
+        config = get_config()
+        
+        # Convert DataFrame to list of dictionaries for the API in one vectorized pass
+        out = df.reindex(columns=['Platform', 'Post', 'Date', 'Engagement', 'Author', 'URL'], fill_value='')
+        out['Date'] = pd.to_datetime(out['Date'], errors='coerce', utc=True).dt.strftime('%Y-%m-%d %H:%M:%S').fillna('')
+        out['Search'] = search_query  # Add the search query
+        rows = out.to_dict(orient='records')
+        
+        # Queue the upload in the background; any error is shown on a later rerun
+        future = get_sheet_writer().submit(post_rows_to_webhook, get_http_session(), config.webhook_url, config.webhook_auth, rows)
+        st.session_state.setdefault("pending_sheet_writes", []).append(future)
+        return True
             
     except Exception as e:
         st.sidebar.error(f"Error saving data: {str(e)}")
         return False
 
+# Send a RapidAPI request, cached on the request itself so reruns with unchanged filters are free
+@st.cache_data(ttl=300, show_spinner=False)
+def rapidapi_request(host, method, endpoint, body=None):
+    headers = get_config().rapidapi_headers[host]
+    res = get_http_session().request(method, f"https://{host}{endpoint}", data=body, headers=headers, timeout=15)
+    
+    # Raise instead of returning so failed requests are not cached
+    if res.status_code != 200:
+        raise RuntimeError(f"API returned status code {res.status_code}")
+    
+    return res.content
+
 # Parse LinkedIn data from API response
 def parse_linkedin_data(response):
     if 'success' in response and response['success'] and 'data' in response and 'items' in response['data'] and 'count' in response['data'] and response['data']['count'] > 0:
-        posts = []
-        for post in response['data']['items']:
-            # Convert timestamp to datetime (ms to datetime)
-            if 'postedDateTimestamp' in post:
-                created_time = datetime.fromtimestamp(post.get('postedDateTimestamp', 0)/1000)
-            else:
-                created_time = datetime.now()
-            
+        # Flatten all posts into one frame and pick the fields we need
+        posts = pd.json_normalize(response['data']['items']).reindex(columns=["text", "postedDateTimestamp", "author.fullName", "url"] + LINKEDIN_ENGAGEMENT_COLUMNS)
+        
+        return pd.DataFrame({
+            "Platform": "LinkedIn",
+            "Post": posts["text"].fillna("No content"),
+            # Convert timestamp to datetime (ms to datetime) as UTC-aware, like the Twitter and Reddit dates below
+            "Date": pd.to_datetime(posts["postedDateTimestamp"], unit="ms", utc=True).fillna(pd.Timestamp.now(tz="UTC")),
             # Calculate engagement as sum of all social activities
-            engagement = 0
-            if 'socialActivityCountsInsight' in post:
-                social_stats = post['socialActivityCountsInsight']
-                engagement = (
-                    social_stats.get('numComments', 0) +
-                    social_stats.get('likeCount', 0) +
-                    social_stats.get('appreciationCount', 0) +
-                    social_stats.get('empathyCount', 0) +
-                    social_stats.get('InterestCount', 0) +
-                    social_stats.get('praiseCount', 0) +
-                    social_stats.get('funnyCount', 0) +
-                    social_stats.get('maybeCount', 0)
-                )
-            
-            posts.append({
-                "Platform": "LinkedIn",
-                "Post": post.get('text', 'No content'),
-                "Date": created_time,
-                "Engagement": engagement,
-                "Author": post.get('author', {}).get('fullName', 'Unknown'),
-                "URL": post.get('url', '')
-            })
-        return pd.DataFrame(posts)
+            "Engagement": posts[LINKEDIN_ENGAGEMENT_COLUMNS].fillna(0).sum(axis=1).astype("int32"),
+            "Author": posts["author.fullName"].fillna("Unknown"),
+            "URL": posts["url"].fillna("")
+        }).astype({"Platform": "category"})
     elif 'count' in response['data'] and response['data']['count'] <= 0:
         st.error("No LinkedIn data found. Please try a different search term.")
         return pd.DataFrame()
@@ -308,8 +459,6 @@ def parse_linkedin_data(response):
 
 # Function to fetch LinkedIn data
 def get_linkedin_data(keyword="nhs pathway", sort_by="relevance", date_posted=""):
-    conn = http.client.HTTPSConnection("linkedin-api8.p.rapidapi.com")
-    
     # Include all healthcare industry codes in the request
     industry_codes = list(HEALTHCARE_INDUSTRIES.values())
     
@@ -322,20 +471,11 @@ def get_linkedin_data(keyword="nhs pathway", sort_by="relevance", date_posted=""
         "authorIndustry": industry_codes  
     }
     
-    api_key = st.secrets["rapidapi"]["key"]
-    
-    headers = {
-        'x-rapidapi-key': api_key,
-        'x-rapidapi-host': "linkedin-api8.p.rapidapi.com",
-        'Content-Type': "application/json"
-    }
-    
     try:
-        conn.request("POST", "/search-posts", json.dumps(payload), headers)
-        res = conn.getresponse()
-        data = res.read()
-        response = json.loads(data.decode("utf-8"))
-        print(response)
+        data = rapidapi_request("linkedin-api8.p.rapidapi.com", "POST", "/search-posts", orjson.dumps(payload))
+        response = orjson.loads(data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LinkedIn response keys=%s", list(response.keys()))
         # Process the LinkedIn API response into a DataFrame
         return parse_linkedin_data(response)
     except Exception as e:
@@ -345,55 +485,36 @@ def get_linkedin_data(keyword="nhs pathway", sort_by="relevance", date_posted=""
 # Parse Twitter data from API response
 def parse_twitter_data(response, min_engagement=10):
     if 'results' in response:
-        posts = []
-        for tweet in response['results']:
-            # Calculate engagement as sum of interactions
-            engagement = (
-                tweet.get('favorite_count', 0) + 
-                tweet.get('retweet_count', 0) + 
-                tweet.get('reply_count', 0) + 
-                tweet.get('quote_count', 0)
-            )
-            
-            # Skip tweets with engagement less than minimum
-            if engagement < min_engagement:
-                continue
-            
-            # Get media URL if available
-            media_url = ""
-            if 'media_url' in tweet and len(tweet['media_url']) > 0:
-                media_url = tweet['media_url'][0]
-            
-            created_time = datetime.strptime(tweet.get('creation_date', ''), "%a %b %d %H:%M:%S %z %Y") if 'creation_date' in tweet else datetime.now()
-            
-            posts.append({
-                "Platform": "Twitter",
-                "Post": tweet.get('text', 'No content'),
-                "Date": created_time,
-                "Engagement": engagement,
-                "Author": tweet.get('user', {}).get('username', 'Unknown'),
-                "URL": f"https://twitter.com/{tweet.get('user', {}).get('username', 'unknown')}/status/{tweet.get('tweet_id')}"
-            })
-        return pd.DataFrame(posts)
+        tweets = pd.json_normalize(response['results']).reindex(columns=["text", "creation_date", "user.username", "tweet_id", "favorite_count", "retweet_count", "reply_count", "quote_count"])
+        
+        # Calculate engagement as sum of interactions
+        tweets["Engagement"] = tweets[["favorite_count", "retweet_count", "reply_count", "quote_count"]].fillna(0).sum(axis=1).astype("int32")
+        
+        # Skip tweets with engagement less than minimum
+        tweets = tweets[tweets["Engagement"] >= min_engagement].reset_index(drop=True)
+        if tweets.empty:
+            return pd.DataFrame()
+        
+        # Parse all timestamps in one vectorized pass; missing or malformed dates fall back to now
+        created_time = pd.to_datetime(tweets["creation_date"], format="%a %b %d %H:%M:%S %z %Y", errors="coerce", utc=True).fillna(pd.Timestamp.now(tz="UTC"))
+        
+        return pd.DataFrame({
+            "Platform": "Twitter",
+            "Post": tweets["text"].fillna("No content"),
+            "Date": created_time,
+            "Engagement": tweets["Engagement"],
+            "Author": tweets["user.username"].fillna("Unknown"),
+            "URL": "https://twitter.com/" + tweets["user.username"].fillna("unknown") + "/status/" + tweets["tweet_id"].astype(str)
+        }).astype({"Platform": "category"})
     else:
         st.error("Failed to retrieve Twitter data. API response format unexpected.")
         return pd.DataFrame()
 
 # Function to fetch Twitter data
 def get_twitter_data(keyword="nhs pathway", section="top", min_engagement=10, start_date=None):
-    conn = http.client.HTTPSConnection("twitter154.p.rapidapi.com")
-    
     # Replace spaces with %20 for URL encoding
     encoded_keyword = keyword.replace(" ", "%20")
     
-    # Get API key directly from secrets
-    api_key = st.secrets["rapidapi"]["key"]
-    
-    headers = {
-        'x-rapidapi-key': api_key,
-        'x-rapidapi-host': "twitter154.p.rapidapi.com"
-    }
-    
     # Format start_date if provided (YYYY-MM-DD)
     date_param = ""
     section_param = f"&section={section}"
@@ -405,10 +526,8 @@ def get_twitter_data(keyword="nhs pathway", section="top", min_engagement=10, st
     endpoint = f"/search/search?query={encoded_keyword}{section_param}&min_retweets=0&min_likes=1&limit=50&language=en{date_param}"
     
     try:
-        conn.request("GET", endpoint, headers=headers)
-        res = conn.getresponse()
-        data = res.read()
-        response = json.loads(data.decode("utf-8"))
+        data = rapidapi_request("twitter154.p.rapidapi.com", "GET", endpoint)
+        response = orjson.loads(data)
         
         # Process the Twitter API response into a DataFrame
         return parse_twitter_data(response, min_engagement)
@@ -419,124 +538,77 @@ def get_twitter_data(keyword="nhs pathway", section="top", min_engagement=10, st
 # Parse Reddit data from API response
 def parse_reddit_data(response, min_engagement=10):
     if 'data' in response:
-        posts = []
-        for post in response['data']:
-            # Calculate engagement as sum of interactions (score and comments)
-            engagement = post.get('score', 0) + post.get('comments', 0)
-            
-            # Skip posts with engagement less than minimum
-            if engagement < min_engagement:
-                continue
-            
-            # Extract post title
-            title = post.get('title', '')
-            
-            # Get post content based on type
-            content = title
-            content_type = "text"
-            media_url = ""
-            
-            if post.get('content'):
-                # Check for text content
-                if post['content'].get('text'):
-                    content = f"{title}\n\n{post['content']['text']}"
-                # Check for image content
-                elif post['content'].get('image') and post['content']['image'].get('url'):
-                    media_url = post['content']['image']['url']
-                    content_type = "image"
-                # Check for video content
-                elif post['content'].get('video') and post['content']['video'].get('url'):
-                    media_url = post['content']['video']['url']
-                    content_type = "video"
-            
-            # Convert timestamp to datetime
-            created_date = post.get('creationDate', '')
-            if created_date:
-                created_time = datetime.strptime(created_date, "%Y-%m-%dT%H:%M:%S.%f%z")
-            else:
-                created_time = datetime.now()
-            
-            # Get author name
-            author = post.get('author', {}).get('name', 'Unknown')
-            
-            # Get post URL
-            post_url = post.get('url', '')
-            
-            posts.append({
-                "Platform": "Reddit",
-                "Post": content,
-                "Date": created_time,
-                "Engagement": engagement,
-                "Author": author,
-                "URL": post_url,
-                "Subreddit": post.get('subreddit', {}).get('name', 'Unknown'),
-                "ContentType": content_type,
-                "MediaURL": media_url
-            })
-            
-        return pd.DataFrame(posts)
+        posts = pd.json_normalize(response['data']).reindex(columns=["title", "content.text", "content.image.url", "content.video.url", "creationDate", "author.name", "url", "subreddit.name", "score", "comments"])
+        
+        # Calculate engagement as sum of interactions (score and comments)
+        posts["Engagement"] = posts[["score", "comments"]].fillna(0).sum(axis=1).astype("int32")
+        
+        # Skip posts with engagement less than minimum
+        posts = posts[posts["Engagement"] >= min_engagement].reset_index(drop=True)
+        if posts.empty:
+            return pd.DataFrame()
+        
+        # Get post content based on type: text first, then image, then video
+        title = posts["title"].fillna("")
+        text = posts["content.text"].fillna("")
+        image_url = posts["content.image.url"].fillna("")
+        video_url = posts["content.video.url"].fillna("")
+        has_text = text != ""
+        is_image = ~has_text & (image_url != "")
+        is_video = ~has_text & ~is_image & (video_url != "")
+        
+        # Convert timestamps to datetime in one vectorized pass; missing dates fall back to now
+        created_time = pd.to_datetime(posts["creationDate"], format="%Y-%m-%dT%H:%M:%S.%f%z", errors="coerce", utc=True).fillna(pd.Timestamp.now(tz="UTC"))
+        
+        return pd.DataFrame({
+            "Platform": "Reddit",
+            "Post": title.mask(has_text, title + "\n\n" + text),
+            "Date": created_time,
+            "Engagement": posts["Engagement"],
+            "Author": posts["author.name"].fillna("Unknown"),
+            "URL": posts["url"].fillna(""),
+            "Subreddit": posts["subreddit.name"].fillna("Unknown"),
+            "ContentType": pd.Series("text", index=posts.index).mask(is_image, "image").mask(is_video, "video"),
+            "MediaURL": image_url.where(is_image, video_url.where(is_video, ""))
+        }).astype({"Platform": "category", "Subreddit": "category", "ContentType": "category"})
     else:
         st.error("Failed to retrieve Reddit data")
         return pd.DataFrame()
 
 # Function to fetch Reddit data
 def get_reddit_data(keyword="healthcare", sort="RELEVANCE", min_engagement=10, time="ALL", subreddit="", subreddit_keyword=""):
-    conn = http.client.HTTPSConnection("reddit-scraper2.p.rapidapi.com")
-    
-    # Get API key directly from secrets
-    api_key = st.secrets["rapidapi"]["key"]
-    
-    headers = {
-        'x-rapidapi-key': api_key,
-        'x-rapidapi-host': "reddit-scraper2.p.rapidapi.com"
-    }
-    
     # Determine which endpoint to use based on whether we're searching by keyword or subreddit
     if subreddit:
         # Clean the subreddit name - remove 'r/', '@', 'https://' etc.
-        clean_subreddit = subreddit.strip()
-        if 'reddit.com/r/' in clean_subreddit:
-            # Extract the subreddit name from a full URL
-            parts = clean_subreddit.split('reddit.com/r/')
-            if len(parts) > 1:
-                clean_subreddit = parts[1].split('/')[0]
-        elif clean_subreddit.startswith('r/'):
-            clean_subreddit = clean_subreddit[2:]
-        elif clean_subreddit.startswith('@'):
-            clean_subreddit = clean_subreddit[1:]
+        match = SUBREDDIT_RE.match(subreddit.strip())
+        clean_subreddit = match.group(1) if match else subreddit.strip()
         
         # Use the exact working URL format from the example
+        sub_url = quote(f"https://www.reddit.com/r/{clean_subreddit}/", safe="")
         # Ensure uppercase ALL for time parameter
         actual_time = time.upper() if time.lower() == "all" else time
         
         # If subreddit_keyword is provided, add it to the search
         if subreddit_keyword:
             encoded_keyword = subreddit_keyword.replace(" ", "%20")
-            endpoint = f"/sub_posts_v3?sub=https%3A%2F%2Fwww.reddit.com%2Fr%2F{clean_subreddit}%2F&sort={sort}&time={actual_time}&query={encoded_keyword}"
+            endpoint = f"/sub_posts_v3?sub={sub_url}&sort={sort}&time={actual_time}&query={encoded_keyword}"
         else:
-            endpoint = f"/sub_posts_v3?sub=https%3A%2F%2Fwww.reddit.com%2Fr%2F{clean_subreddit}%2F&sort={sort}&time={actual_time}"
+            endpoint = f"/sub_posts_v3?sub={sub_url}&sort={sort}&time={actual_time}"
     else:
         # Replace spaces with %20 for URL encoding
         encoded_keyword = keyword.replace(" ", "%20")
         # Construct the endpoint to search Reddit posts by keyword
         actual_time = time.upper() if time.lower() == "all" else time
         endpoint = f"/search_posts_v3?query={encoded_keyword}&sort={sort}&time={actual_time}&nsfw=0"
-        print(endpoint)
+        logger.debug("Reddit endpoint=%s", endpoint)
     
     try:
-        conn.request("GET", endpoint, headers=headers)
-        res = conn.getresponse()
-        
-        if res.status != 200:
-            st.error(f"API returned status code {res.status}")
-            return pd.DataFrame()
-            
-        data = res.read()
-        response_text = data.decode("utf-8")
+        data = rapidapi_request("reddit-scraper2.p.rapidapi.com", "GET", endpoint)
         
+        # Parse the raw bytes with orjson; empty or invalid bodies fail here without an intermediate str
         try:
-            response = json.loads(response_text)
-        except json.JSONDecodeError:
+            response = orjson.loads(data)
+        except orjson.JSONDecodeError:
             st.error(f"Failed to parse API response as JSON")
             return pd.DataFrame()
         
@@ -550,17 +622,10 @@ def get_reddit_data(keyword="healthcare", sort="RELEVANCE", min_engagement=10, t
 def load_mock_data_from_sheet():
     try:
         with st.spinner("Loading test data from Google Sheet..."):
-            # Get mock sheet URL from secrets
-            sheet_url = st.secrets["gsheets"]["mock_sheet_url"]
-            sheet_url = sheet_url.replace('/edit?usp=sharing', '/export?format=csv')
-            df = pd.read_csv(sheet_url)
-            
-            # Convert Date column to datetime
-            df["Date"] = pd.to_datetime(df["Date"])
+            # Get mock sheet URL from the configuration
+            df = prepare_mock_data(get_config().mock_sheet_url)
             
             if not df.empty:
-                # Sort by engagement in descending order to show highest engagement first
-                df = df.sort_values(by="Engagement", ascending=False).drop_duplicates(subset=["Post"], keep="first")
                 return df
     except Exception as e:
         st.error(f"Error loading data from Google Sheet: {str(e)}")
@@ -696,8 +761,7 @@ def fetch_platform_data(platform, params):
                 # Filter to only platform posts if needed
                 if platform != "All":
                     mock_df = mock_df[mock_df["Platform"] == platform]
-                # Sort by engagement in descending order
-                mock_df = mock_df.sort_values(by="Engagement", ascending=False)
+                # The mock sheet is already sorted by engagement, and filtering keeps that order
                 return mock_df
         except Exception as e:
             st.error(f"Error: {str(e)}")
@@ -705,11 +769,13 @@ def fetch_platform_data(platform, params):
             # Filter to only platform posts if needed
             if platform != "All":
                 mock_df = mock_df[mock_df["Platform"] == platform]
-            # Sort by engagement in descending order
-            mock_df = mock_df.sort_values(by="Engagement", ascending=False)
+            # The mock sheet is already sorted by engagement, and filtering keeps that order
             st.warning("Using mockup data due to API error.")
             return mock_df
 
+# Report any background Google Sheet writes that have finished
+report_sheet_writes()
+
 # Load data based on selected platform
 if platform == "LinkedIn" and linkedin_keyword and linkedin_keyword.lower() != "":
     params = {
@@ -907,9 +973,8 @@ elif platform == "Big Data":
     
     if st.button("Generate AI Analysis"):
         with st.spinner("Analyzing data with AI..."):
-            analysis_result = analyze_with_openai(df, analysis_prompt)
             st.markdown("### AI Analysis Results")
-            st.markdown(analysis_result)
+            analyze_with_openai(df, analysis_prompt, st.empty())
 else:
     # Load from Google Sheet by default
     df_all = load_mock_data_from_sheet()
@@ -1047,11 +1112,9 @@ else:
                         st.session_state.recent_current_page = min(total_pages, current_page + 1)
         else:
             st.info("No new posts in the past 7 days.")
-    
-    # Sort by engagement in descending order
-    df = df.sort_values(by="Engagement", ascending=False)
 
-# Display posts
+# Display posts; a fragment so paging and the table toggle rerun only this section
+@st.fragment
 def display_posts(df):
     st.header("Posts")
     
@@ -1186,10 +1249,8 @@ def display_posts(df):
 
         # Also provide the traditional dataframe view if needed
         if st.checkbox("Show as table"):
-            display_df = df.copy()
-            # Remove raw_content from display to save space
-            if "raw_content" in display_df.columns:
-                display_df = display_df.drop(columns=["raw_content"])
+            # Select every column except raw_content instead of copying the whole frame to drop it
+            display_df = df[[column for column in df.columns if column != "raw_content"]]
             st.dataframe(display_df, use_container_width=True)
     else:
         st.info("No data available for the selected filters.")
@@ -1206,14 +1267,16 @@ def prepare_data_for_analysis(df, max_posts=50, max_chars_per_post=500):
         # Truncate post content
         df_sample['Post'] = df_sample['Post'].apply(lambda x: str(x)[:max_chars_per_post] + '...' if len(str(x)) > max_chars_per_post else str(x))
         
-        # Create a summary of the dataset
+        # Create a summary of the dataset, one aggregation pass per column
+        engagement_stats = df['Engagement'].agg(['mean', 'max'])
+        date_min, date_max = df['Date'].agg(['min', 'max'])
         summary = {
             'total_records': len(df),
             'sample_size': len(df_sample),
-            'date_range': f"{df['Date'].min().strftime('%Y-%m-%d')} to {df['Date'].max().strftime('%Y-%m-%d')}",
-            'platforms': df['Platform'].value_counts().to_dict(),
-            'avg_engagement': df['Engagement'].mean(),
-            'max_engagement': df['Engagement'].max()
+            'date_range': f"{date_min.strftime('%Y-%m-%d')} to {date_max.strftime('%Y-%m-%d')}",
+            'platforms': df['Platform'].value_counts().loc[lambda counts: counts > 0].to_dict(),
+            'avg_engagement': engagement_stats['mean'],
+            'max_engagement': engagement_stats['max']
         }
         
         return df_sample, summary
@@ -1221,7 +1284,8 @@ def prepare_data_for_analysis(df, max_posts=50, max_chars_per_post=500):
         st.error(f"Error preparing data for analysis: {str(e)}")
         return pd.DataFrame(), {}
 
-# Update the display_metrics function
+# Update the display_metrics function; a fragment so the analysis button reruns only this section
+@st.fragment
 def display_metrics(df):
     st.header("Engagement Metrics")
     if not df.empty:
@@ -1234,7 +1298,7 @@ def display_metrics(df):
         
         # Create a bar chart for engagement by platform
         if platform == "All":
-            platform_stats = df.groupby("Platform")["Engagement"].mean().reset_index()
+            platform_stats = df.groupby("Platform", observed=True)["Engagement"].mean().reset_index()
             st.bar_chart(platform_stats.set_index("Platform"))
         else:
             st.bar_chart(df.set_index("Date")["Engagement"])
@@ -1244,8 +1308,6 @@ def display_metrics(df):
         
         if(st.button("Generate AI Topic Analysis")):
             if (not df.empty):
-            # Add 5 second delay
-                
                 with st.spinner("Analyzing posts with AI..."):
                     # Prepare data for analysis
                     df_sample, summary = prepare_data_for_analysis(df)
@@ -1269,12 +1331,9 @@ def display_metrics(df):
                         Focus on healthcare-specific insights and professional implications.
                         """
                         
-                        # Get analysis from OpenAI
-                        analysis_result = analyze_with_openai(df_sample, analysis_prompt)
-                        
-                        # Display results in an expander
+                        # Stream the analysis from OpenAI into an expander
                         with st.expander("View Analysis Results", expanded=True):
-                            st.markdown(analysis_result)
+                            analyze_with_openai(df_sample, analysis_prompt, st.empty())
             else:
                 st.warning("Could not prepare data for analysis. Please try again.")
         elif df.empty:
@@ -1282,6 +1341,23 @@ def display_metrics(df):
     else:
         st.info("No data available for the selected filters.")
 
+# Big Data table with search; a fragment so typing a search term reruns only the table
+@st.fragment
+def display_big_data_table(df):
+    # Data table view with search functionality
+    search_term = st.text_input("Search in content", "")
+    
+    # Select every column except raw_content instead of copying the whole frame to drop it
+    display_df = df[[column for column in df.columns if column != "raw_content"]]
+        
+    # Apply search filter if provided
+    if search_term:
+        mask = display_df['Post'].str.contains(search_term, case=False, na=False)
+        display_df = display_df[mask]
+        st.write(f"Found {len(display_df)} records containing '{search_term}'")
+        
+    st.dataframe(display_df, use_container_width=True)
+
 # Display posts and metrics
 if platform != "Big Data":
     display_posts(df)
@@ -1292,21 +1368,7 @@ else:
     tabs = st.tabs(["Data Table", "Visualizations", "Summary Metrics"])
     
     with tabs[0]:
-        # Data table view with search functionality
-        search_term = st.text_input("Search in content", "")
-        
-        display_df = df.copy()
-        # Remove raw_content from display to save space
-        if "raw_content" in display_df.columns:
-            display_df = display_df.drop(columns=["raw_content"])
-            
-        # Apply search filter if provided
-        if search_term:
-            mask = display_df['Post'].str.contains(search_term, case=False, na=False)
-            display_df = display_df[mask]
-            st.write(f"Found {len(display_df)} records containing '{search_term}'")
-            
-        st.dataframe(display_df, use_container_width=True)
+        display_big_data_table(df)
     
     with tabs[1]:
         # Enhanced visualizations
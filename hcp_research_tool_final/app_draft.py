@@ -1,9 +1,13 @@
 import streamlit as st
 import pandas as pd
+import pyarrow.csv as pacsv
+import io
+import numpy as np
+import hashlib
 import http.client
 import json
 import requests
-from datetime import datetime
+from datetime import datetime, timezone
 from dateutil.relativedelta import relativedelta
 import os
 import openai  # Add OpenAI import
@@ -45,6 +49,59 @@ HEALTHCARE_INDUSTRIES = {
     "Physicians": 2040
 }
 
+# OpenAI sample sizes: top posts overall, posts per platform, and characters kept per post
+OPENAI_TOP_POSTS = 5
+OPENAI_POSTS_PER_PLATFORM = 3
+OPENAI_POST_CHAR_LIMIT = 500
+# Fixed seed so the same data always produces the same sample (and the same cached analysis)
+OPENAI_SAMPLE_SEED = 42
+
+# Columns read by the post rendering loop
+POST_COLUMNS = ["Platform", "Author", "Date", "Post", "Engagement", "URL", "ContentType", "MediaURL", "Subreddit"]
+
+# Download and parse a sheet once per TTL window instead of on every rerun
+@st.cache_data(ttl=600, show_spinner=False)
+def load_sheet(url):
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    # Parse with Arrow's multi-threaded CSV reader into Arrow-backed columns; newlines_in_values keeps
+    # quoted multi-line posts intact, which pandas' pyarrow engine cannot do once the file spans blocks
+    table = pacsv.read_csv(
+        io.BytesIO(response.content),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+# Logos shown next to each post, by platform
+PLATFORM_LOGO_URLS = {
+    "LinkedIn": "https://content.linkedin.com/content/dam/me/business/en-us/amp/brand-site/v2/bg/LI-Bug.svg.original.svg",
+    "Twitter": "https://about.twitter.com/content/dam/about-twitter/x/brand-toolkit/logo-black.png.twimg.1920.png",
+    "Reddit": "https://www.redditstatic.com/desktop2x/img/favicon/android-icon-192x192.png",
+    "External Source": "https://cdn-icons-png.flaticon.com/512/2906/2906274.png"
+}
+
+# Download each logo once per process so rendering posts doesn't refetch them
+@st.cache_resource
+def load_platform_logos():
+    logos = {}
+    for name, url in PLATFORM_LOGO_URLS.items():
+        try:
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            # st.image only accepts SVG as markup text, raster images as bytes
+            is_svg = "svg" in response.headers.get("Content-Type", "")
+            logos[name] = response.text if is_svg else response.content
+        except Exception:
+            # Fall back to the remote URL if the logo could not be downloaded
+            logos[name] = url
+    return logos
+
+# Order rows by engagement (highest first) by sorting only the Engagement values
+def sort_by_engagement(df):
+    order = np.argsort(-df["Engagement"].to_numpy(), kind="stable")
+    return df.iloc[order]
+
 # Create sidebar for filters
 st.sidebar.header("Filters")
 
@@ -84,7 +141,7 @@ def load_big_data_from_sheet():
             # Get sheet URL from secrets
             sheet_url = st.secrets["gsheets"]["sheet_url"]
             sheet_url = sheet_url.replace('/edit?gid=0', '/export?format=csv')
-            df = pd.read_csv(sheet_url)
+            df = load_sheet(sheet_url)
             
             # Create Platform column and rename columns for consistency
             df["Platform"] = "External Source"
@@ -105,14 +162,14 @@ def load_big_data_from_sheet():
             if "URL" not in df.columns:
                 df["URL"] = ""
                 
-            # Select only needed columns
-            columns = ["Platform", "Post", "Date", "Engagement", "Author", "URL", "raw_content"]
+            # Select only needed columns; raw_content is left out since the Big Data views never show it
+            columns = ["Platform", "Post", "Date", "Engagement", "Author", "URL"]
             df = df[columns]
             
             # Process and combine with mock data
             if not df.empty:
                 # Clean and deduplicate
-                df = df.sort_values(by="Engagement", ascending=False)
+                df = sort_by_engagement(df)
                 df = df.drop_duplicates(subset=["Post"], keep="first")
                 
                 # Augment with mock data
@@ -120,7 +177,7 @@ def load_big_data_from_sheet():
                 if not mock_df.empty:
                     # Combine and deduplicate again
                     df = pd.concat([df, mock_df])
-                    df = df.sort_values(by="Engagement", ascending=False)
+                    df = sort_by_engagement(df)
                     df = df.drop_duplicates(subset=["Post"], keep="first")
                 
                 return df
@@ -133,90 +190,99 @@ def load_big_data_from_sheet():
 # Function for OpenAI analysis
 def analyze_with_openai(df, prompt):
     try:
-        # Get API key from secrets
-        api_key = st.secrets["openai"]["api_key"]
-        
-        # Create a more efficient sampling strategy
-        # Get high engagement posts with more weight
-        high_engagement = df.nlargest(5, 'Engagement')[['Post', 'Engagement', 'Author', 'Platform']]
-        
-        # Get diverse samples from different platforms
-        platform_samples = []
-        for platform in df['Platform'].unique():
-            platform_df = df[df['Platform'] == platform]
-            if not platform_df.empty:
-                platform_samples.append(platform_df.sample(min(3, len(platform_df))))
-        
-        if platform_samples:
-            diverse_sample = pd.concat(platform_samples)[['Post', 'Engagement', 'Author', 'Platform']]
-        else:
-            # Fallback to random sampling if no platform-specific samples
-            diverse_sample = df.sample(min(10, len(df)))[['Post', 'Engagement', 'Author', 'Platform']]
-        
-        # Get comprehensive statistics
-        stats = {
-            'total_records': len(df),
-            'avg_engagement': df['Engagement'].mean(),
-            'max_engagement': df['Engagement'].max(),
-            'min_engagement': df['Engagement'].min(),
-            'engagement_std': df['Engagement'].std(),
-            'unique_authors': df['Author'].nunique(),
-            'platforms': df['Platform'].value_counts().to_dict(),
-            'date_range': f"{df['Date'].min().strftime('%Y-%m-%d')} to {df['Date'].max().strftime('%Y-%m-%d')}",
-        }
-        
-        # Construct an improved prompt
-        full_prompt = f"""
-        # Healthcare Data Analysis Request
-        
-        ## Dataset Overview
-        - Total Records: {stats['total_records']}
-        - Date Range: {stats['date_range']}
-        - Platforms: {', '.join([f"{p} ({c})" for p, c in stats['platforms'].items()])}
-        
-        ## Engagement Metrics
-        - Average: {stats['avg_engagement']:.2f}
-        - Maximum: {stats['max_engagement']}
-        - Minimum: {stats['min_engagement']}
-        - Standard Deviation: {stats['engagement_std']:.2f}
-        - Unique Authors: {stats['unique_authors']}
-        
-        ## HIGH ENGAGEMENT SAMPLE:
-        {high_engagement.to_string()}
-        
-        ## DIVERSE PLATFORM SAMPLE:
-        {diverse_sample.to_string()}
+        # Identical data and prompt reuse the earlier response instead of calling the API again
+        data_hash = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+        return run_openai_analysis(data_hash, prompt, df)
+    except Exception as e:
+        return f"Error during OpenAI analysis: {str(e)}"
 
-        ## USER ANALYSIS REQUEST:
-        {prompt}
+# Cached on the data hash and prompt; the leading underscore keeps Streamlit from hashing the DataFrame again
+@st.cache_data(ttl=3600, show_spinner=False)
+def run_openai_analysis(data_hash, prompt, _df):
+    # Get API key from secrets
+    api_key = st.secrets["openai"]["api_key"]
+    df = _df
+    
+    # Create a more efficient sampling strategy
+    # Get high engagement posts with more weight
+    sample_columns = ['Post', 'Engagement', 'Author', 'Platform']
+    high_engagement = df.nlargest(OPENAI_TOP_POSTS, 'Engagement')[sample_columns]
+    
+    # Get diverse samples from different platforms: shuffle once with a fixed seed, then keep a few posts per platform
+    # (positions rather than labels, since concatenated data can repeat index labels)
+    shuffled_platforms = df['Platform'].reset_index(drop=True).sample(frac=1, random_state=OPENAI_SAMPLE_SEED)
+    sample_positions = shuffled_platforms.groupby(shuffled_platforms, observed=True, sort=False).head(OPENAI_POSTS_PER_PLATFORM).index
+    diverse_sample = df.iloc[sample_positions][sample_columns]
+    
+    if diverse_sample.empty:
+        # Fallback to random sampling if no platform-specific samples
+        diverse_sample = df.sample(min(10, len(df)), random_state=OPENAI_SAMPLE_SEED)[sample_columns]
+    
+    # Cap each post's length so long posts can't blow up the prompt
+    high_engagement = high_engagement.assign(Post=high_engagement['Post'].astype(str).str.slice(0, OPENAI_POST_CHAR_LIMIT))
+    diverse_sample = diverse_sample.assign(Post=diverse_sample['Post'].astype(str).str.slice(0, OPENAI_POST_CHAR_LIMIT))
+    
+    # Get comprehensive statistics
+    stats = {
+        'total_records': len(df),
+        'avg_engagement': df['Engagement'].mean(),
+        'max_engagement': df['Engagement'].max(),
+        'min_engagement': df['Engagement'].min(),
+        'engagement_std': df['Engagement'].std(),
+        'unique_authors': df['Author'].nunique(),
+        'platforms': df['Platform'].value_counts().loc[lambda counts: counts > 0].to_dict(),
+        'date_range': f"{df['Date'].min().strftime('%Y-%m-%d')} to {df['Date'].max().strftime('%Y-%m-%d')}",
+    }
+    
+    # Construct an improved prompt
+    full_prompt = f"""
+    # Healthcare Data Analysis Request
+    
+    ## Dataset Overview
+    - Total Records: {stats['total_records']}
+    - Date Range: {stats['date_range']}
+    - Platforms: {', '.join([f"{p} ({c})" for p, c in stats['platforms'].items()])}
+    
+    ## Engagement Metrics
+    - Average: {stats['avg_engagement']:.2f}
+    - Maximum: {stats['max_engagement']}
+    - Minimum: {stats['min_engagement']}
+    - Standard Deviation: {stats['engagement_std']:.2f}
+    - Unique Authors: {stats['unique_authors']}
+    
+    ## HIGH ENGAGEMENT SAMPLE:
+    {high_engagement.to_string()}
+    
+    ## DIVERSE PLATFORM SAMPLE:
+    {diverse_sample.to_string()}
 
-        Provide a clear, structured analysis focusing specifically on the healthcare implications.
-        Use bullet points for key findings and organize insights by theme.
-        """
-        
-        # Use the OpenAI client to make the API call
-        client = openai.OpenAI(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are a healthcare data analyst specializing in analyzing social media and web content related to healthcare professionals. Your analysis should be evidence-based, focusing on practical insights for pharmaceutical and healthcare organizations."
-                },
-                {
-                    "role": "user", 
-                    "content": full_prompt
-                }
-            ],
-            temperature=0.3  # Lower temperature for more focused analysis
-        )
-        
-        # Return the analysis
-        return response.choices[0].message.content
+    ## USER ANALYSIS REQUEST:
+    {prompt}
+
+    Provide a clear, structured analysis focusing specifically on the healthcare implications.
+    Use bullet points for key findings and organize insights by theme.
+    """
     
-    except Exception as e:
-        return f"Error during OpenAI analysis: {str(e)}"
+    # Use the OpenAI client to make the API call
+    client = openai.OpenAI(api_key=api_key)
+    
+    response = client.chat.completions.create(
+        model="gpt-4",
+        messages=[
+            {
+                "role": "system", 
+                "content": "You are a healthcare data analyst specializing in analyzing social media and web content related to healthcare professionals. Your analysis should be evidence-based, focusing on practical insights for pharmaceutical and healthcare organizations."
+            },
+            {
+                "role": "user", 
+                "content": full_prompt
+            }
+        ],
+        temperature=0.3  # Lower temperature for more focused analysis
+    )
+    
+    # Return the analysis
+    return response.choices[0].message.content
 
 # Add to Google Sheet using webhook
 def add_to_google_sheet(df, search_query=""):
@@ -267,11 +333,11 @@ def parse_linkedin_data(response):
     if 'success' in response and response['success'] and 'data' in response and 'items' in response['data'] and 'count' in response['data'] and response['data']['count'] > 0:
         posts = []
         for post in response['data']['items']:
-            # Convert timestamp to datetime (ms to datetime)
+            # Convert timestamp to datetime (ms to datetime), timezone-aware so it converts to UTC unshifted
             if 'postedDateTimestamp' in post:
-                created_time = datetime.fromtimestamp(post.get('postedDateTimestamp', 0)/1000)
+                created_time = datetime.fromtimestamp(post.get('postedDateTimestamp', 0)/1000, tz=timezone.utc)
             else:
-                created_time = datetime.now()
+                created_time = datetime.now(timezone.utc)
             
             # Calculate engagement as sum of all social activities
             engagement = 0
@@ -362,7 +428,7 @@ def parse_twitter_data(response, min_engagement=10):
             if 'media_url' in tweet and len(tweet['media_url']) > 0:
                 media_url = tweet['media_url'][0]
             
-            created_time = datetime.strptime(tweet.get('creation_date', ''), "%a %b %d %H:%M:%S %z %Y") if 'creation_date' in tweet else datetime.now()
+            created_time = datetime.strptime(tweet.get('creation_date', ''), "%a %b %d %H:%M:%S %z %Y") if 'creation_date' in tweet else datetime.now(timezone.utc)
             
             posts.append({
                 "Platform": "Twitter",
@@ -452,7 +518,7 @@ def parse_reddit_data(response, min_engagement=10):
             if created_date:
                 created_time = datetime.strptime(created_date, "%Y-%m-%dT%H:%M:%S.%f%z")
             else:
-                created_time = datetime.now()
+                created_time = datetime.now(timezone.utc)
             
             # Get author name
             author = post.get('author', {}).get('name', 'Unknown')
@@ -551,14 +617,14 @@ def load_mock_data_from_sheet():
             # Get mock sheet URL from secrets
             sheet_url = st.secrets["gsheets"]["mock_sheet_url"]
             sheet_url = sheet_url.replace('/edit?usp=sharing', '/export?format=csv')
-            df = pd.read_csv(sheet_url)
+            df = load_sheet(sheet_url)
             
             # Convert Date column to datetime
             df["Date"] = pd.to_datetime(df["Date"])
             
             if not df.empty:
                 # Sort by engagement in descending order to show highest engagement first
-                df = df.sort_values(by="Engagement", ascending=False).drop_duplicates(subset=["Post"], keep="first")
+                df = sort_by_engagement(df).drop_duplicates(subset=["Post"], keep="first")
                 return df
     except Exception as e:
         st.error(f"Error loading data from Google Sheet: {str(e)}")
@@ -681,8 +747,11 @@ def fetch_platform_data(platform, params):
                 )
             
             if not data_df.empty:
+                # Parse dates once into a UTC datetime64 column; the parsers emit timezone-aware datetimes only
+                data_df["Date"] = pd.to_datetime(data_df["Date"], utc=True)
+                
                 # Sort by engagement in descending order
-                data_df = data_df.sort_values(by="Engagement", ascending=False)
+                data_df = sort_by_engagement(data_df)
                 st.success(f"Successfully retrieved {len(data_df)} {platform} posts")
                 
                 # Save results to Google Sheet
@@ -695,7 +764,7 @@ def fetch_platform_data(platform, params):
                 if platform != "All":
                     mock_df = mock_df[mock_df["Platform"] == platform]
                 # Sort by engagement in descending order
-                mock_df = mock_df.sort_values(by="Engagement", ascending=False)
+                mock_df = sort_by_engagement(mock_df)
                 return mock_df
         except Exception as e:
             st.error(f"Error: {str(e)}")
@@ -704,7 +773,7 @@ def fetch_platform_data(platform, params):
             if platform != "All":
                 mock_df = mock_df[mock_df["Platform"] == platform]
             # Sort by engagement in descending order
-            mock_df = mock_df.sort_values(by="Engagement", ascending=False)
+            mock_df = sort_by_engagement(mock_df)
             st.warning("Using mockup data due to API error.")
             return mock_df
 
@@ -792,148 +861,159 @@ else:
         st.success(f"Successfully loaded {len(df)} posts from default dataset")
     
     # Sort by engagement in descending order
-    df = df.sort_values(by="Engagement", ascending=False)
+    df = sort_by_engagement(df)
 
-# Display posts
+# Store low-cardinality labels as categoricals for cheaper comparisons, groupbys and value counts
+df = df.astype({column: "category" for column in ("Platform", "ContentType") if column in df.columns})
+
+# Display posts; as a fragment, pagination clicks rerun only this section
+@st.fragment
 def display_posts(df):
     st.header("Posts")
     
     if not df.empty:
-        # Create a single expander for all posts
-        with st.expander("View All Posts", expanded=True):
-            # Set fixed posts per page to 20
-            posts_per_page = 20
-            
-            # Calculate total pages
-            total_posts = len(df)
-            total_pages = (total_posts + posts_per_page - 1) // posts_per_page
-            
-            # Get current page from session state
-            current_page = st.session_state.get('current_page', 1)
-            
-            # Calculate start and end indices for current page
-            start_idx = (current_page - 1) * posts_per_page
-            end_idx = min(start_idx + posts_per_page, total_posts)
-            
-            # Display posts for current page
-            for i, row in df.iloc[start_idx:end_idx].iterrows():
-                with st.container():
-                    col1, col2 = st.columns([1, 4])
-                    
-                    with col1:
-                        # Display platform icon or logo
-                        if row["Platform"] == "LinkedIn":
-                            st.image("https://content.linkedin.com/content/dam/me/business/en-us/amp/brand-site/v2/bg/LI-Bug.svg.original.svg", width=50)
-                        elif row["Platform"] == "Twitter":
-                            st.image("https://about.twitter.com/content/dam/about-twitter/x/brand-toolkit/logo-black.png.twimg.1920.png", width=50)
-                        elif row["Platform"] == "Reddit":
-                            st.image("https://www.redditstatic.com/desktop2x/img/favicon/android-icon-192x192.png", width=50)
-                        elif row["Platform"] == "External Source":
-                            st.image("https://cdn-icons-png.flaticon.com/512/2906/2906274.png", width=50)
-                        
-                        # Display engagement metrics
-                        st.metric("Engagement", row["Engagement"])
-                    
-                    with col2:
-                        # Author and date
-                        if row["Platform"] == "Reddit" and "Subreddit" in row:
-                            st.markdown(f"**{row['Author']}** in r/{row['Subreddit']} • {row['Date'].strftime('%Y-%m-%d')}")
-                        else:
-                            st.markdown(f"**{row['Author']}** • {row['Date'].strftime('%Y-%m-%d')}")
-                        
-                        # Post content with character limit and expandable view
-                        post_content = row["Post"]
-                        char_limit = 300
+        # Compact table of all posts: one frontend-virtualized element instead of a widget tree per post
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "URL": st.column_config.LinkColumn("URL"),
+                "MediaURL": st.column_config.ImageColumn("Media"),
+                "Post": st.column_config.TextColumn("Post", width="large")
+            }
+        )
+        
+        # The richer per-post view is only built when asked for
+        if st.toggle("Show detailed post view"):
+            # Create a single expander for all posts
+            with st.expander("View All Posts", expanded=True):
+                # Set fixed posts per page to 20
+                posts_per_page = 20
+                
+                # Calculate total pages
+                total_posts = len(df)
+                total_pages = (total_posts + posts_per_page - 1) // posts_per_page
+                
+                # Get current page from session state
+                current_page = st.session_state.get('current_page', 1)
+                
+                # Calculate start and end indices for current page
+                start_idx = (current_page - 1) * posts_per_page
+                end_idx = min(start_idx + posts_per_page, total_posts)
+                
+                # Take only the current page's rows, and only the rendered columns
+                page_columns = [column for column in POST_COLUMNS if column in df.columns]
+                page = df[page_columns].iloc[start_idx:end_idx]
+                
+                # Format dates, truncate and escape post text for the whole page with vectorized ops
+                char_limit = 300
+                post_text = page["Post"].astype(str)
+                page = page.assign(
+                    post_date=page["Date"].dt.strftime('%Y-%m-%d'),
+                    post_is_long=post_text.str.len() > char_limit,
+                    post_preview=post_text.str.slice(0, char_limit),
+                    post_html=post_text.str.replace('"', '&quot;', regex=False).str.replace('\n', '<br>', regex=False)
+                )
+                # Convert the page to plain records once
+                page_records = page.to_dict('records')
+                platform_logos = load_platform_logos()
+                
+                # Display posts for current page
+                for row in page_records:
+                    with st.container():
+                        col1, col2 = st.columns([1, 4])
                         
-                        # If post is longer than character limit, show truncated version with "View more" option
-                        if len(str(post_content)) > char_limit:
-                            # Display truncated content
-                            st.write(f"{str(post_content)[:char_limit]}...")
+                        with col1:
+                            # Display platform icon or logo
+                            logo = platform_logos.get(row["Platform"])
+                            if logo is not None:
+                                st.image(logo, width=50)
                             
-                            # Use HTML details tag for expandable content
-                            details_html = f"""
-                            <details>
-                                <summary style="cursor: pointer; color: #1E88E5; margin-bottom: 20px;">View full post</summary>
-                                <div style="padding: 10px; border-left: 2px solid #1E88E5; margin-top: 8px;">
-                                    {str(post_content).replace('"', '&quot;').replace('\n', '<br>')}
-                                </div>
-                            </details>
-                            """
-                            st.markdown(details_html, unsafe_allow_html=True)
-                        else:
-                            # Display short posts directly
-                            st.write(post_content)
+                            # Display engagement metrics
+                            st.metric("Engagement", row["Engagement"])
                         
-                        # Display raw_content if available for Big Data
-                        if row["Platform"] == "External Source" and "raw_content" in row and row["raw_content"]:
-                            st.markdown("**Raw Content:**")
-                            raw_content = str(row["raw_content"])
-                            if len(raw_content) > char_limit:
-                                st.write(f"{raw_content[:char_limit]}...")
-                                st.expander("View full raw content").write(raw_content)
+                        with col2:
+                            # Author and date
+                            if row["Platform"] == "Reddit" and "Subreddit" in row:
+                                st.markdown(f"**{row['Author']}** in r/{row['Subreddit']} • {row['post_date']}")
                             else:
-                                st.write(raw_content)
-                        
-                        # Display media content for Reddit posts if available
-                        if row["Platform"] == "Reddit" and "ContentType" in row and "MediaURL" in row and row["MediaURL"]:
-                            if row["ContentType"] == "image":
-                                st.image(row["MediaURL"], use_container_width=True)
-                            elif row["ContentType"] == "video":
-                                st.video(row["MediaURL"])
+                                st.markdown(f"**{row['Author']}** • {row['post_date']}")
+                            
+                            # Post content with character limit and expandable view
+                            post_content = row["Post"]
+                            
+                            # If post is longer than character limit, show truncated version with "View more" option
+                            if row["post_is_long"]:
+                                # Display truncated content
+                                st.write(f"{row['post_preview']}...")
+                                
+                                # Use HTML details tag for expandable content
+                                details_html = f"""
+                                <details>
+                                    <summary style="cursor: pointer; color: #1E88E5; margin-bottom: 20px;">View full post</summary>
+                                    <div style="padding: 10px; border-left: 2px solid #1E88E5; margin-top: 8px;">
+                                        {row['post_html']}
+                                    </div>
+                                </details>
+                                """
+                                st.markdown(details_html, unsafe_allow_html=True)
+                            else:
+                                # Display short posts directly
+                                st.write(post_content)
+                            
+                            # Display media content for Reddit posts if available
+                            if row["Platform"] == "Reddit" and "ContentType" in row and "MediaURL" in row and row["MediaURL"]:
+                                if row["ContentType"] == "image":
+                                    st.image(row["MediaURL"], use_container_width=True)
+                                elif row["ContentType"] == "video":
+                                    st.video(row["MediaURL"])
+                            
+                            # If URL exists, make it clickable
+                            if "URL" in row and row["URL"]:
+                                st.markdown(f"[View Source]({row['URL']})")
                         
-                        # If URL exists, make it clickable
-                        if "URL" in row and row["URL"]:
-                            st.markdown(f"[View Source]({row['URL']})")
-                    
-                    st.divider()
-            
-            # Add page navigation at the bottom with improved styling
-            st.markdown("""
-            <style>
-            .stButton {
-                display: flex;
-                width: 100%;
-            }
-            .stButton > button {
-                width: 100%;
-                padding: 0.5rem 1rem;
-            }
-            div[data-testid="column"] {
-                display: flex;
-                align-items: center;
-            }
-            div[data-testid="column"]:first-child {
-                justify-content: flex-start;
-            }
-            div[data-testid="column"]:nth-child(2) {
-                justify-content: center;
-            }
-            div[data-testid="column"]:last-child {
-                justify-content: flex-end;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-            
-            col1, col2, col3 = st.columns([1, 2, 1])
-            
-            with col1:
-                if st.button("Previous Page", disabled=current_page <= 1, key="prev_button", use_container_width=True):
-                    st.session_state.current_page = max(1, current_page - 1)
-            
-            with col2:
-                st.markdown(f"<div style='text-align: center; width: 100%;'>Page {current_page} of {total_pages}</div>", unsafe_allow_html=True)
-            
-            with col3:
-                if st.button("Next Page", disabled=current_page >= total_pages, key="next_button", use_container_width=True):
-                    st.session_state.current_page = min(total_pages, current_page + 1)
-
-        # Also provide the traditional dataframe view if needed
-        if st.checkbox("Show as table"):
-            display_df = df.copy()
-            # Remove raw_content from display to save space
-            if "raw_content" in display_df.columns:
-                display_df = display_df.drop(columns=["raw_content"])
-            st.dataframe(display_df, use_container_width=True)
+                        st.divider()
+                
+                # Add page navigation at the bottom with improved styling
+                st.markdown("""
+                <style>
+                .stButton {
+                    display: flex;
+                    width: 100%;
+                }
+                .stButton > button {
+                    width: 100%;
+                    padding: 0.5rem 1rem;
+                }
+                div[data-testid="column"] {
+                    display: flex;
+                    align-items: center;
+                }
+                div[data-testid="column"]:first-child {
+                    justify-content: flex-start;
+                }
+                div[data-testid="column"]:nth-child(2) {
+                    justify-content: center;
+                }
+                div[data-testid="column"]:last-child {
+                    justify-content: flex-end;
+                }
+                </style>
+                """, unsafe_allow_html=True)
+                
+                col1, col2, col3 = st.columns([1, 2, 1])
+                
+                with col1:
+                    if st.button("Previous Page", disabled=current_page <= 1, key="prev_button", use_container_width=True):
+                        st.session_state.current_page = max(1, current_page - 1)
+                
+                with col2:
+                    st.markdown(f"<div style='text-align: center; width: 100%;'>Page {current_page} of {total_pages}</div>", unsafe_allow_html=True)
+                
+                with col3:
+                    if st.button("Next Page", disabled=current_page >= total_pages, key="next_button", use_container_width=True):
+                        st.session_state.current_page = min(total_pages, current_page + 1)
     else:
         st.info("No data available for the selected filters.")
 
@@ -954,7 +1034,7 @@ def prepare_data_for_analysis(df, max_posts=50, max_chars_per_post=500):
             'total_records': len(df),
             'sample_size': len(df_sample),
             'date_range': f"{df['Date'].min().strftime('%Y-%m-%d')} to {df['Date'].max().strftime('%Y-%m-%d')}",
-            'platforms': df['Platform'].value_counts().to_dict(),
+            'platforms': df['Platform'].value_counts().loc[lambda counts: counts > 0].to_dict(),
             'avg_engagement': df['Engagement'].mean(),
             'max_engagement': df['Engagement'].max()
         }
@@ -977,7 +1057,7 @@ def display_metrics(df):
         
         # Create a bar chart for engagement by platform
         if platform == "All":
-            platform_stats = df.groupby("Platform")["Engagement"].mean().reset_index()
+            platform_stats = df.groupby("Platform", observed=True)["Engagement"].mean().reset_index()
             st.bar_chart(platform_stats.set_index("Platform"))
         else:
             st.bar_chart(df.set_index("Date")["Engagement"])
@@ -987,8 +1067,6 @@ def display_metrics(df):
         
         if(st.button("Generate AI Topic Analysis")):
             if (not df.empty):
-            # Add 5 second delay
-                
                 with st.spinner("Analyzing posts with AI..."):
                     # Prepare data for analysis
                     df_sample, summary = prepare_data_for_analysis(df)
@@ -1038,10 +1116,8 @@ else:
         # Data table view with search functionality
         search_term = st.text_input("Search in content", "")
         
-        display_df = df.copy()
-        # Remove raw_content from display to save space
-        if "raw_content" in display_df.columns:
-            display_df = display_df.drop(columns=["raw_content"])
+        # raw_content is never loaded for Big Data, so the table shows the frame as is
+        display_df = df
             
         # Apply search filter if provided
         if search_term:
@@ -1064,7 +1140,7 @@ else:
             
         with fig_col2:
             # Count posts by platform
-            platform_counts = df['Platform'].value_counts().reset_index()
+            platform_counts = df['Platform'].value_counts().loc[lambda counts: counts > 0].reset_index()
             platform_counts.columns = ['Platform', 'Count']
             st.bar_chart(platform_counts.set_index('Platform'))
             st.caption("Post Count by Platform")
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
+import functools
 import plotly.express as px
 
 # 📊 NHS Prescription Data Dashboard
@@ -10,9 +10,94 @@ st.title("📊 NHS Dec 2024 Prescription Data Dashboard")
 # 🔹 Load Data from GitHub
 CSV_URL = "https://raw.githubusercontent.com/aljonleynes11/nhs-trial/main/prescriptions/prescription_cardio_and_diabetes_final.csv"
 
-@st.cache_data
+# Columns read from the CSVs; YEAR_MONTH is skipped at parse time since no chart uses it.
+# read_csv raises if any of these is missing, so the page code can rely on every one being present
+PRESCRIPTION_COLUMNS = [
+    "REGION_NAME",
+    "REGION_CODE",
+    "ICB_NAME",
+    "ICB_CODE",
+    "DISPENSER_ACCOUNT_TYPE",
+    "BNF_PRESENTATION_CODE",
+    "BNF_PRESENTATION_NAME",
+    "SNOMED_CODE",
+    "SUPPLIER_NAME",
+    "UNIT_OF_MEASURE",
+    "GENERIC_BNF_EQUIVALENT_CODE",
+    "GENERIC_BNF_EQUIVALENT_NAME",
+    "BNF_CHEMICAL_SUBSTANCE_CODE",
+    "BNF_CHEMICAL_SUBSTANCE",
+    "BNF_PARAGRAPH_CODE",
+    "BNF_PARAGRAPH",
+    "BNF_SECTION_CODE",
+    "BNF_SECTION",
+    "BNF_CHAPTER_CODE",
+    "BNF_CHAPTER",
+    "PREP_CLASS",
+    "PRESCRIBED_PREP_CLASS",
+    "ITEMS",
+    "TOTAL_QUANTITY",
+    "NIC",
+    "PHARMACY_ADVANCED_SERVICE",
+]
+
+# Dtypes pinned at read time: repeated labels as categories, counts and codes as nullable integers
+PRESCRIPTION_DTYPES = {
+    "REGION_NAME": "category",
+    "BNF_CHEMICAL_SUBSTANCE": "category",
+    "UNIT_OF_MEASURE": "category",
+    "BNF_SECTION": "category",
+    "BNF_SECTION_CODE": "Int32",
+    "ITEMS": "Int32",
+}
+
+# Persisted to disk, so a restarted app reuses the parsed frame instead of downloading and parsing the CSV again
+@st.cache_data(persist="disk")
 def load_data(url):
-    return pd.read_csv(url)
+    # Parse with Arrow's multi-threaded CSV reader
+    return pd.read_csv(url, engine="pyarrow", usecols=PRESCRIPTION_COLUMNS, dtype=PRESCRIPTION_DTYPES)
+
+# Serialize the filtered rows for download once per data source and section choice; only runs when the button is clicked
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(source, section_choice, _df):
+    return _df.to_csv(index=False).encode()
+
+# "code - section" selectbox labels mapped to their BNF_SECTION_CODE, built once per data source
+@st.cache_data(show_spinner=False)
+def section_labels(source, _df):
+    # Pair each BNF_SECTION_CODE with its own section name, then map each "code - section" label back to the code
+    sections = _df[["BNF_SECTION_CODE", "BNF_SECTION"]].dropna().drop_duplicates("BNF_SECTION_CODE")
+    return dict(zip(sections["BNF_SECTION_CODE"].astype(str) + " - " + sections["BNF_SECTION"].astype(str), sections["BNF_SECTION_CODE"].astype(int)))
+
+# Row positions of each BNF section, found once per data source so filtering a section is a lookup instead of a full-column scan
+@st.cache_data(show_spinner=False)
+def section_rows(source, _df):
+    return _df.groupby("BNF_SECTION_CODE", observed=True).indices
+
+# NIC and ITEMS totals per value of key, aggregated once per data source and section choice
+@st.cache_data(show_spinner=False)
+def group_totals(source, section_choice, key, _df):
+    # Sum NIC and ITEMS per category code with np.bincount, keeping only the groups present in this selection
+    labels = _df[key].astype("category")
+    codes = labels.cat.codes.to_numpy()
+    present = codes >= 0
+    codes = codes[present]
+    n_groups = len(labels.cat.categories)
+    observed = np.bincount(codes, minlength=n_groups) > 0
+    nic = np.bincount(codes, weights=_df["NIC"].to_numpy(dtype="float64", na_value=0)[present], minlength=n_groups)
+    items = np.bincount(codes, weights=_df["ITEMS"].to_numpy(dtype="float64", na_value=0)[present], minlength=n_groups)
+    # Plain string labels, so charts plot only these rows in rank order rather than every category
+    return pd.DataFrame({
+        key: labels.cat.categories[observed].astype(str),
+        "NIC": nic[observed],
+        "ITEMS": items[observed].astype("int64"),
+    })
+
+# Horizontal Plotly bars, top row first, shaded by value like the previous seaborn palettes
+def bar_chart(data, x, y, color_scale, xlabel, ylabel, title):
+    fig = px.bar(data, x=x, y=y, orientation="h", color=x, color_continuous_scale=color_scale, labels={x: xlabel, y: ylabel}, title=title)
+    fig.update_layout(yaxis={"autorange": "reversed"}, coloraxis_showscale=False)
+    return fig
 
 # Load dataset
 st.session_state.df = load_data(CSV_URL)
@@ -20,98 +105,80 @@ st.success("✅ Data loaded successfully!")
 
 df = st.session_state.df
 
-# Drop YEAR_MONTH Column (if exists)
-if "YEAR_MONTH" in df.columns:
-    df.drop(columns=["YEAR_MONTH"], inplace=True)
-
 # 🔍 Display Data Preview
 st.subheader("🔍 Data Preview")
-st.write(df.head())
+st.dataframe(df.head())
 
 # 📌 Filter by BNF Section
-if "BNF_SECTION_CODE" in df.columns:
-    st.subheader("📌 Filter Data by BNF Section")
-
-    # Create a mapping from BNF_SECTION_CODE to BNF_SECTION
-    section_mapping = {str(int(code)): f"{int(code)} - {section}" for code, section in zip(df["BNF_SECTION_CODE"].dropna().unique(), df["BNF_SECTION"].dropna().unique())}
-
-    section_choice = st.selectbox("Select BNF Section:", ["All"] + list(section_mapping.values()))
-
-    # Filter the dataframe based on the selected BNF Section
-    if section_choice != "All":
-        section_code = str(int([k for k, v in section_mapping.items() if v == section_choice][0]))  # Extract corresponding BNF_SECTION_CODE
-        df_filtered = df[df["BNF_SECTION_CODE"] == section_code]
-    else:
-        df_filtered = df
-
-    st.subheader("📄 Filtered Data")
-    st.write(df_filtered.head())
-
-    st.download_button("📥 Download Filtered Data", data=df_filtered.to_csv(index=False), file_name="filtered_nhs_data.csv", mime="text/csv")
-# 🌍 Top 10 Regions by Prescriptions
-if "REGION_NAME" in df_filtered.columns:
-    st.subheader("🌍 Top 10 Regions with Most Prescriptions")
-    top_regions = df_filtered.groupby("REGION_NAME").agg({"NIC": "sum", "ITEMS": "sum"}).nlargest(10, "ITEMS").reset_index()
-    top_regions.rename(columns={"NIC": "Net Ingredient Cost (£)", "ITEMS": "Number Of Prescription Items Dispensed"}, inplace=True)
-
-    st.write(top_regions)
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    sns.barplot(x=top_regions["Number Of Prescription Items Dispensed"], y=top_regions["REGION_NAME"], palette="Reds_r", ax=ax)
-    ax.set_xlabel("Total Items Dispensed")
-    ax.set_ylabel("Region Name")
-    ax.set_title("Top 10 Regions by Prescriptions Dispensed")
-    st.pyplot(fig)
-
-# 📊 Top 10 Drugs by Cost & Items
-if "BNF_CHEMICAL_SUBSTANCE" in df_filtered.columns and "NIC" in df_filtered.columns and "ITEMS" in df_filtered.columns:
-    st.subheader("📊 Grouped Data by BNF Chemical Substance")
-    grouped_data = df_filtered.groupby("BNF_CHEMICAL_SUBSTANCE").agg({"NIC": "sum", "ITEMS": "sum"}).reset_index()
-    grouped_data.rename(columns={"NIC": "Net Ingredient Cost (£)", "ITEMS": "Number Of Prescription Items Dispensed"}, inplace=True)
-
-    st.write(grouped_data)
-
-    # 💊 Top 10 Drugs by Cost
-    st.subheader("💊 Top 10 Most Prescribed Drugs by Cost")
-    top_drugs = grouped_data.nlargest(10, "Net Ingredient Cost (£)")
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    sns.barplot(x=top_drugs["Net Ingredient Cost (£)"], y=top_drugs["BNF_CHEMICAL_SUBSTANCE"], palette="Blues_r", ax=ax)
-    ax.set_xlabel("Total NIC (£)")
-    ax.set_ylabel("Drug Name")
-    ax.set_title("Top 10 Most Prescribed Drugs by NIC")
-    st.pyplot(fig)
-
-    # 💊 Top 10 Drugs by Items Dispensed
-    st.subheader("💊 Top 10 Most Prescribed Drugs by Items Dispensed")
-    top_items = grouped_data.nlargest(10, "Number Of Prescription Items Dispensed")
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    sns.barplot(x=top_items["Number Of Prescription Items Dispensed"], y=top_items["BNF_CHEMICAL_SUBSTANCE"], palette="Greens_r", ax=ax)
-    ax.set_xlabel("Total Items Dispensed")
-    ax.set_ylabel("Drug Name")
-    ax.set_title("Top 10 Most Prescribed Drugs by Items Dispensed")
-    st.pyplot(fig)
-
-# 🥧 Prescription Cost Distribution by BNF Section
-if "BNF_CHEMICAL_SUBSTANCE" in df_filtered.columns and "NIC" in df_filtered.columns:
-    st.subheader("🥧 Prescription Cost Distribution by BNF Section")
-
-    section_costs = df_filtered.groupby("BNF_CHEMICAL_SUBSTANCE")["NIC"].sum().reset_index()
-    top_sections = section_costs.nlargest(20, "NIC")
-    top_sections["BNF_CHEMICAL_SUBSTANCE"] = top_sections["BNF_CHEMICAL_SUBSTANCE"].astype(str)
-    top_sections.rename(columns={"BNF_CHEMICAL_SUBSTANCE": "BNF Section", "NIC": "Total Cost (£)"}, inplace=True)
-
-    fig = px.pie(top_sections, values="Total Cost (£)", names="BNF Section", title="Top 20 BNF Sections by Prescription Cost", hole=0.3, color_discrete_sequence=px.colors.qualitative.Set2)
-    st.plotly_chart(fig)
-
-# 📦 Prescription Distribution by Unit of Measure (UOM)
-if "UNIT_OF_MEASURE" in df_filtered.columns and "ITEMS" in df_filtered.columns:
-    st.subheader("📦 Prescription Distribution by Unit of Measure")
-
-    uom_distribution = df_filtered.groupby("UNIT_OF_MEASURE")["ITEMS"].sum().reset_index()
-    top_uoms = uom_distribution.nlargest(10, "ITEMS")
-    top_uoms.rename(columns={"UNIT_OF_MEASURE": "Unit of Measure", "ITEMS": "Total Items Dispensed"}, inplace=True)
-
-    fig = px.pie(top_uoms, values="Total Items Dispensed", names="Unit of Measure", title="Top 10 Units of Measure by Items Dispensed", hole=0.3, color_discrete_sequence=px.colors.qualitative.Pastel)
-    st.plotly_chart(fig)
+st.subheader("📌 Filter Data by BNF Section")
+
+section_codes = section_labels(CSV_URL, df)
+
+section_choice = st.selectbox("Select BNF Section:", ["All"] + list(section_codes))
+
+# Filter the dataframe based on the selected BNF Section
+if section_choice != "All":
+    df_filtered = df.iloc[section_rows(CSV_URL, df)[section_codes[section_choice]]]
+else:
+    df_filtered = df
+
+st.subheader("📄 Filtered Data")
+st.dataframe(df_filtered.head())
+
+st.download_button("📥 Download Filtered Data", data=functools.partial(to_csv_bytes, CSV_URL, section_choice, df_filtered), file_name="filtered_nhs_data.csv", mime="text/csv")
+
+# Charts in tabs that run lazily, so each rerun only builds the open tab's tables and figures
+region_tab, drug_tab, uom_tab = st.tabs(["🌍 Regions", "💊 Drugs", "📦 Units of Measure"], on_change="rerun")
+
+with region_tab:
+    # 🌍 Top 10 Regions by Prescriptions
+    if region_tab.open:
+        st.subheader("🌍 Top 10 Regions with Most Prescriptions")
+        top_regions = group_totals(CSV_URL, section_choice, "REGION_NAME", df_filtered).nlargest(10, "ITEMS").reset_index(drop=True)
+        top_regions.rename(columns={"NIC": "Net Ingredient Cost (£)", "ITEMS": "Number Of Prescription Items Dispensed"}, inplace=True)
+
+        st.dataframe(top_regions)
+
+        st.plotly_chart(bar_chart(top_regions, "Number Of Prescription Items Dispensed", "REGION_NAME", "Reds", "Total Items Dispensed", "Region Name", "Top 10 Regions by Prescriptions Dispensed"))
+
+with drug_tab:
+    # 📊 Top 10 Drugs by Cost & Items
+    if drug_tab.open:
+        st.subheader("📊 Grouped Data by BNF Chemical Substance")
+        grouped_data = group_totals(CSV_URL, section_choice, "BNF_CHEMICAL_SUBSTANCE", df_filtered)
+        grouped_data.rename(columns={"NIC": "Net Ingredient Cost (£)", "ITEMS": "Number Of Prescription Items Dispensed"}, inplace=True)
+
+        st.dataframe(grouped_data)
+
+        # 💊 Top 10 Drugs by Cost
+        st.subheader("💊 Top 10 Most Prescribed Drugs by Cost")
+        top_drugs = grouped_data.nlargest(10, "Net Ingredient Cost (£)")
+
+        st.plotly_chart(bar_chart(top_drugs, "Net Ingredient Cost (£)", "BNF_CHEMICAL_SUBSTANCE", "Blues", "Total NIC (£)", "Drug Name", "Top 10 Most Prescribed Drugs by NIC"))
+
+        # 💊 Top 10 Drugs by Items Dispensed
+        st.subheader("💊 Top 10 Most Prescribed Drugs by Items Dispensed")
+        top_items = grouped_data.nlargest(10, "Number Of Prescription Items Dispensed")
+
+        st.plotly_chart(bar_chart(top_items, "Number Of Prescription Items Dispensed", "BNF_CHEMICAL_SUBSTANCE", "Greens", "Total Items Dispensed", "Drug Name", "Top 10 Most Prescribed Drugs by Items Dispensed"))
+
+        # 🥧 Prescription Cost Distribution by BNF Section, reusing the per-substance totals grouped above
+        st.subheader("🥧 Prescription Cost Distribution by BNF Section")
+
+        top_sections = grouped_data.nlargest(20, "Net Ingredient Cost (£)")[["BNF_CHEMICAL_SUBSTANCE", "Net Ingredient Cost (£)"]]
+        top_sections.rename(columns={"BNF_CHEMICAL_SUBSTANCE": "BNF Section", "Net Ingredient Cost (£)": "Total Cost (£)"}, inplace=True)
+
+        fig = px.pie(top_sections, values="Total Cost (£)", names="BNF Section", title="Top 20 BNF Sections by Prescription Cost", hole=0.3, color_discrete_sequence=px.colors.qualitative.Set2)
+        st.plotly_chart(fig)
+
+with uom_tab:
+    # 📦 Prescription Distribution by Unit of Measure (UOM)
+    if uom_tab.open:
+        st.subheader("📦 Prescription Distribution by Unit of Measure")
+
+        uom_distribution = group_totals(CSV_URL, section_choice, "UNIT_OF_MEASURE", df_filtered)[["UNIT_OF_MEASURE", "ITEMS"]]
+        top_uoms = uom_distribution.nlargest(10, "ITEMS")
+        top_uoms.rename(columns={"UNIT_OF_MEASURE": "Unit of Measure", "ITEMS": "Total Items Dispensed"}, inplace=True)
+
+        fig = px.pie(top_uoms, values="Total Items Dispensed", names="Unit of Measure", title="Top 10 Units of Measure by Items Dispensed", hole=0.3, color_discrete_sequence=px.colors.qualitative.Pastel)
+        st.plotly_chart(fig)
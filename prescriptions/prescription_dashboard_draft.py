@@ -1,10 +1,97 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import glob
-import matplotlib.pyplot as plt
-import seaborn as sns
+import functools
 import plotly.express as px
 
+# Columns read from the CSVs; YEAR_MONTH is skipped at parse time since no chart uses it.
+# read_csv raises if any of these is missing, so the page code can rely on every one being present
+PRESCRIPTION_COLUMNS = [
+    "REGION_NAME",
+    "REGION_CODE",
+    "ICB_NAME",
+    "ICB_CODE",
+    "DISPENSER_ACCOUNT_TYPE",
+    "BNF_PRESENTATION_CODE",
+    "BNF_PRESENTATION_NAME",
+    "SNOMED_CODE",
+    "SUPPLIER_NAME",
+    "UNIT_OF_MEASURE",
+    "GENERIC_BNF_EQUIVALENT_CODE",
+    "GENERIC_BNF_EQUIVALENT_NAME",
+    "BNF_CHEMICAL_SUBSTANCE_CODE",
+    "BNF_CHEMICAL_SUBSTANCE",
+    "BNF_PARAGRAPH_CODE",
+    "BNF_PARAGRAPH",
+    "BNF_SECTION_CODE",
+    "BNF_SECTION",
+    "BNF_CHAPTER_CODE",
+    "BNF_CHAPTER",
+    "PREP_CLASS",
+    "PRESCRIBED_PREP_CLASS",
+    "ITEMS",
+    "TOTAL_QUANTITY",
+    "NIC",
+    "PHARMACY_ADVANCED_SERVICE",
+]
+
+# Dtypes pinned at read time: repeated labels as categories, counts and codes as nullable integers
+PRESCRIPTION_DTYPES = {
+    "REGION_NAME": "category",
+    "BNF_CHEMICAL_SUBSTANCE": "category",
+    "UNIT_OF_MEASURE": "category",
+    "BNF_SECTION": "category",
+    "BNF_SECTION_CODE": "Int32",
+    "ITEMS": "Int32",
+}
+
+# Read and merge the CSV files once per file set instead of on every rerun
+@st.cache_data(show_spinner="Loading data...")
+def load_prescriptions(paths):
+    return pd.concat([pd.read_csv(file, engine="pyarrow", usecols=PRESCRIPTION_COLUMNS, dtype=PRESCRIPTION_DTYPES) for file in paths], ignore_index=True)
+
+# Serialize the filtered rows for download once per data source and section choice; only runs when the button is clicked
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(source, section_choice, _df):
+    return _df.to_csv(index=False).encode()
+
+# "Section <code>" selectbox labels mapped to their BNF_SECTION_CODE, built once per data source
+@st.cache_data(show_spinner=False)
+def section_labels(source, _df):
+    unique_sections = _df["BNF_SECTION_CODE"].dropna().unique()
+    return {f"Section {int(code)}": int(code) for code in unique_sections}
+
+# Row positions of each BNF section, found once per data source so filtering a section is a lookup instead of a full-column scan
+@st.cache_data(show_spinner=False)
+def section_rows(source, _df):
+    return _df.groupby("BNF_SECTION_CODE", observed=True).indices
+
+# NIC and ITEMS totals per value of key, aggregated once per data source and section choice
+@st.cache_data(show_spinner=False)
+def group_totals(source, section_choice, key, _df):
+    # Sum NIC and ITEMS per category code with np.bincount, keeping only the groups present in this selection
+    labels = _df[key].astype("category")
+    codes = labels.cat.codes.to_numpy()
+    present = codes >= 0
+    codes = codes[present]
+    n_groups = len(labels.cat.categories)
+    observed = np.bincount(codes, minlength=n_groups) > 0
+    nic = np.bincount(codes, weights=_df["NIC"].to_numpy(dtype="float64", na_value=0)[present], minlength=n_groups)
+    items = np.bincount(codes, weights=_df["ITEMS"].to_numpy(dtype="float64", na_value=0)[present], minlength=n_groups)
+    # Plain string labels, so charts plot only these rows in rank order rather than every category
+    return pd.DataFrame({
+        key: labels.cat.categories[observed].astype(str),
+        "NIC": nic[observed],
+        "ITEMS": items[observed].astype("int64"),
+    })
+
+# Horizontal Plotly bars, top row first, shaded by value like the previous seaborn palettes
+def bar_chart(data, x, y, color_scale, xlabel, ylabel, title):
+    fig = px.bar(data, x=x, y=y, orientation="h", color=x, color_continuous_scale=color_scale, labels={x: xlabel, y: ylabel}, title=title)
+    fig.update_layout(yaxis={"autorange": "reversed"}, coloraxis_showscale=False)
+    return fig
+
 # Load multiple CSV files from data/prescriptions/
 st.title("📊 NHS Dec 2024 Prescription Data Dashboard")
 
@@ -13,151 +100,128 @@ data_files = glob.glob("data/prescription_*.csv")
 if not data_files:
     st.error("No data files found")
 else:
-    # Load and merge all CSV files
-    df_list = [pd.read_csv(file) for file in data_files]
-    df = pd.concat(df_list, ignore_index=True)
-    # Drop YEAR_MONTH as it's not needed
-    if "YEAR_MONTH" in df.columns:
-        df.drop(columns=["YEAR_MONTH"], inplace=True)
+    # Load and merge all CSV files; a sorted tuple keeps the cache key stable across reruns
+    data_paths = tuple(sorted(data_files))
+    df = load_prescriptions(data_paths)
 
     # Display dataset preview
     st.subheader("🔍 Data Preview")
-    st.write(df.head())
-
-    # Ensure the column exists
-    if "BNF_SECTION_CODE" in df.columns:
-        st.subheader("📌 Filter Data by BNF Section")
-
-        # Get unique BNF section codes dynamically
-        unique_sections = df["BNF_SECTION_CODE"].dropna().unique()
-        section_mapping = {str(int(code)): f"Section {int(code)}" for code in unique_sections}
-
-        # User selects a section
-        section_choice = st.selectbox(
-            "Select BNF Section:", 
-            options=["All"] + list(section_mapping.values())
-        )
-
-        # Apply filter
-        if section_choice != "All":
-            selected_code = int([k for k, v in section_mapping.items() if v == section_choice][0])
-            df_filtered = df[df["BNF_SECTION_CODE"] == selected_code]
-        else:
-            df_filtered = df  # No filter applied
-
-        # Display filtered data
-        st.subheader("📄 Filtered Data")
-        st.write(df_filtered.head())
-
-        # Save filtered data as CSV
-        st.download_button(
-            label="📥 Download Filtered Data",
-            data=df_filtered.to_csv(index=False),
-            file_name="filtered_nhs_data.csv",
-            mime="text/csv"
-        )
-
+    st.dataframe(df.head())
+
+    st.subheader("📌 Filter Data by BNF Section")
+
+    # Get unique BNF section codes dynamically, keyed by their selectbox label
+    label_to_code = section_labels(data_paths, df)
+
+    # User selects a section
+    section_choice = st.selectbox(
+        "Select BNF Section:", 
+        options=["All"] + list(label_to_code)
+    )
+
+    # Apply filter
+    if section_choice != "All":
+        selected_code = label_to_code[section_choice]
+        df_filtered = df.iloc[section_rows(data_paths, df)[selected_code]]
+    else:
+        df_filtered = df  # No filter applied
+
+    # Display filtered data
+    st.subheader("📄 Filtered Data")
+    st.dataframe(df_filtered.head())
+
+    # Save filtered data as CSV, generated on demand when the button is clicked
+    st.download_button(
+        label="📥 Download Filtered Data",
+        data=functools.partial(to_csv_bytes, data_paths, section_choice, df_filtered),
+        file_name="filtered_nhs_data.csv",
+        mime="text/csv"
+    )
+
+    # Charts in tabs that run lazily, so each rerun only builds the open tab's tables and figures
+    region_tab, drug_tab = st.tabs(["🌍 Regions", "💊 Drugs"], on_change="rerun")
+
+    with region_tab:
         # 🌍 Top 10 Regions with Most Prescriptions
-        if "REGION_NAME" in df_filtered.columns:
+        if region_tab.open:
             st.subheader("🌍 Top 10 Regions with Most Prescriptions")
-            top_regions = df_filtered.groupby("REGION_NAME").agg(
-                {"NIC": "sum", "ITEMS": "sum"}
-            ).nlargest(10, "ITEMS").reset_index()
+            top_regions = group_totals(data_paths, section_choice, "REGION_NAME", df_filtered).nlargest(10, "ITEMS").reset_index(drop=True)
 
             # Rename columns for readability
             top_regions.rename(columns={"NIC": "Net Ingredient Cost", "ITEMS": "Number Of Prescription Items Dispensed"}, inplace=True)
             
-            st.write(top_regions)
+            st.dataframe(top_regions)
             
-            fig, ax = plt.subplots(figsize=(10, 5))
-            sns.barplot(x=top_regions["Number Of Prescription Items Dispensed"], y=top_regions["REGION_NAME"], palette="Reds_r", ax=ax)
-            ax.set_xlabel("Total Items Dispensed")
-            ax.set_ylabel("Region Name")
-            ax.set_title("Top 10 Regions by Prescriptions Dispensed")
-            st.pyplot(fig)
+            st.plotly_chart(bar_chart(top_regions, "Number Of Prescription Items Dispensed", "REGION_NAME", "Reds", "Total Items Dispensed", "Region Name", "Top 10 Regions by Prescriptions Dispensed"))
 
+    with drug_tab:
         # 📊 Grouped View by BNF_CHEMICAL_SUBSTANCE
-        if "BNF_CHEMICAL_SUBSTANCE" in df_filtered.columns and "NIC" in df_filtered.columns and "ITEMS" in df_filtered.columns:
+        if drug_tab.open:
             st.subheader("📊 Grouped Data by BNF Chemical Substance")
-            grouped_data = df_filtered.groupby("BNF_CHEMICAL_SUBSTANCE").agg(
-                {"NIC": "sum", "ITEMS": "sum"}
-            ).reset_index()
+            grouped_data = group_totals(data_paths, section_choice, "BNF_CHEMICAL_SUBSTANCE", df_filtered)
 
             # Rename columns for readability
             grouped_data.rename(columns={"NIC": "Net Ingredient Cost", "ITEMS": "Number Of Prescription Items Dispensed"}, inplace=True)
 
-            st.write(grouped_data)
+            st.dataframe(grouped_data)
 
             # 💊 Top 10 Drugs by NIC & Items
             st.subheader("💊 Top 10 Most Prescribed Drugs by Cost")
             top_drugs = grouped_data.nlargest(10, "Net Ingredient Cost")
 
-            fig, ax = plt.subplots(figsize=(10, 5))
-            sns.barplot(x=top_drugs["Net Ingredient Cost"], y=top_drugs["BNF_CHEMICAL_SUBSTANCE"], palette="Blues_r", ax=ax)
-            ax.set_xlabel("Total NIC (£)")
-            ax.set_ylabel("Drug Name")
-            ax.set_title("Top 10 Most Prescribed Drugs by NIC")
-            st.pyplot(fig)
+            st.plotly_chart(bar_chart(top_drugs, "Net Ingredient Cost", "BNF_CHEMICAL_SUBSTANCE", "Blues", "Total NIC (£)", "Drug Name", "Top 10 Most Prescribed Drugs by NIC"))
 
             # Top 10 by Items Dispensed
             st.subheader("💊 Top 10 Most Prescribed Drugs by Items Dispensed")
             top_items = grouped_data.nlargest(10, "Number Of Prescription Items Dispensed")
 
-            fig, ax = plt.subplots(figsize=(10, 5))
-            sns.barplot(x=top_items["Number Of Prescription Items Dispensed"], y=top_items["BNF_CHEMICAL_SUBSTANCE"], palette="Greens_r", ax=ax)
-            ax.set_xlabel("Total Items Dispensed")
-            ax.set_ylabel("Drug Name")
-            ax.set_title("Top 10 Most Prescribed Drugs by Items Dispensed")
-            st.pyplot(fig)
+            st.plotly_chart(bar_chart(top_items, "Number Of Prescription Items Dispensed", "BNF_CHEMICAL_SUBSTANCE", "Greens", "Total Items Dispensed", "Drug Name", "Top 10 Most Prescribed Drugs by Items Dispensed"))
         
             # 🥧 Prescription Cost Distribution by BNF Section
             st.subheader("🥧 Prescription Cost Distribution by BNF Section")
 
-            if "BNF_SECTION_CODE" in df_filtered.columns and "NIC" in df_filtered.columns:
-                # Aggregate cost per section
-                section_costs = df_filtered.groupby("BNF_SECTION_CODE")["NIC"].sum().reset_index()
+            # Aggregate cost per section
+            section_costs = group_totals(data_paths, section_choice, "BNF_SECTION_CODE", df_filtered)[["BNF_SECTION_CODE", "NIC"]]
 
-                # Get Top 10 BNF Sections
-                top_sections = section_costs.nlargest(10, "NIC")
+            # Get Top 10 BNF Sections
+            top_sections = section_costs.nlargest(10, "NIC")
 
-                # Convert BNF codes to readable labels
-                top_sections["BNF_SECTION_CODE"] = top_sections["BNF_SECTION_CODE"].astype(str)
-                top_sections.rename(columns={"BNF_SECTION_CODE": "BNF Section", "NIC": "Total Cost (£)"}, inplace=True)
+            # Readable labels for the pie; group_totals already returns the codes as strings
+            top_sections.rename(columns={"BNF_SECTION_CODE": "BNF Section", "NIC": "Total Cost (£)"}, inplace=True)
 
-                # Create Pie Chart
-                fig = px.pie(
-                    top_sections,
-                    values="Total Cost (£)",
-                    names="BNF Section",
-                    title="Top 10 BNF Sections by Prescription Cost",
-                    hole=0.3,  # Donut style
-                    color_discrete_sequence=px.colors.qualitative.Set2
-                )
+            # Create Pie Chart
+            fig = px.pie(
+                top_sections,
+                values="Total Cost (£)",
+                names="BNF Section",
+                title="Top 10 BNF Sections by Prescription Cost",
+                hole=0.3,  # Donut style
+                color_discrete_sequence=px.colors.qualitative.Set2
+            )
 
-                st.plotly_chart(fig)
+            st.plotly_chart(fig)
             
-                            # 🥧 Prescription Distribution by Unit of Measure (UOM)
-                st.subheader("📦 Prescription Distribution by Unit of Measure")
-
-                if "UOM" in df_filtered.columns and "ITEMS" in df_filtered.columns:
-                    # Aggregate total items dispensed per UOM
-                    uom_distribution = df_filtered.groupby("UOM")["ITEMS"].sum().reset_index()
-
-                    # Get Top 10 UOMs by Items Dispensed
-                    top_uoms = uom_distribution.nlargest(10, "ITEMS")
-
-                    # Rename columns for clarity
-                    top_uoms.rename(columns={"UOM": "Unit of Measure", "ITEMS": "Total Items Dispensed"}, inplace=True)
-
-                    # Create Pie Chart
-                    fig = px.pie(
-                        top_uoms,
-                        values="Total Items Dispensed",
-                        names="Unit of Measure",
-                        title="Top 10 Units of Measure by Items Dispensed",
-                        hole=0.3,  # Donut style
-                        color_discrete_sequence=px.colors.qualitative.Pastel
-                    )
-
-                    st.plotly_chart(fig)
+            # 📦 Prescription Distribution by Unit of Measure
+            st.subheader("📦 Prescription Distribution by Unit of Measure")
+
+            # Aggregate total items dispensed per unit of measure
+            uom_distribution = group_totals(data_paths, section_choice, "UNIT_OF_MEASURE", df_filtered)[["UNIT_OF_MEASURE", "ITEMS"]]
+
+            # Get Top 10 UOMs by Items Dispensed
+            top_uoms = uom_distribution.nlargest(10, "ITEMS")
+
+            # Rename columns for clarity
+            top_uoms.rename(columns={"UNIT_OF_MEASURE": "Unit of Measure", "ITEMS": "Total Items Dispensed"}, inplace=True)
+
+            # Create Pie Chart
+            fig = px.pie(
+                top_uoms,
+                values="Total Items Dispensed",
+                names="Unit of Measure",
+                title="Top 10 Units of Measure by Items Dispensed",
+                hole=0.3,  # Donut style
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+
+            st.plotly_chart(fig)
 